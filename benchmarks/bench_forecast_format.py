@@ -0,0 +1,108 @@
+"""Per-turn forecast formatting cost: legacy dict/string formatting vs. the parsed Forecast model.
+
+Before, one turn formatted the raw OpenWeatherMap JSON three times (UI expander, LLM prompt,
+chat history), re-parsing every timestamp each time. Now it parses once into a Forecast and
+the three renderers are memoized views.
+
+Usage: python benchmarks/bench_forecast_format.py [--turns N]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from forecast import Forecast, RAIN_CONDITIONS  # noqa: E402
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "forecast_jakarta.json")
+
+
+def legacy_format_weather_data(weather_data):
+    """Verbose formatter as it was before the Forecast model"""
+    city_name = weather_data['city']['name']
+    country_code = weather_data['city']['country']
+    output = f"Data Cuaca untuk {city_name}, {country_code}:\n\n"
+    current_date = datetime.now().date()
+    forecasts_by_date = {}
+    for forecast in weather_data['list']:
+        forecast_time = datetime.fromtimestamp(forecast['dt'])
+        forecasts_by_date.setdefault(forecast_time.date(), []).append(forecast)
+    for date in sorted(forecasts_by_date.keys())[:5]:
+        if date == current_date:
+            output += f"\n📅 Hari ini ({date.strftime('%d %B %Y')})\n"
+        else:
+            output += f"\n📅 {(date - current_date).days} hari ke depan ({date.strftime('%d %B %Y')})\n"
+        for forecast in forecasts_by_date[date]:
+            forecast_time = datetime.fromtimestamp(forecast['dt'])
+            output += f"""
+⏰ Pukul {forecast_time.strftime('%H:%M')}
+🌡️ Suhu: {forecast['main']['temp']}°C
+🌡️ Terasa seperti: {forecast['main']['feels_like']}°C
+💧 Kelembaban: {forecast['main']['humidity']}%
+💨 Kecepatan Angin: {forecast['wind']['speed']} m/s
+🌥️ Kondisi: {forecast['weather'][0]['description']}
+📊 Tekanan: {forecast['main']['pressure']} hPa
+---"""
+    return output.strip()
+
+
+def legacy_format_weather_prompt(weather_data, target_dates):
+    """Compact formatter as it was before the Forecast model"""
+    current_date = datetime.now().date()
+    forecasts_by_date = {}
+    for forecast in weather_data['list']:
+        forecast_time = datetime.fromtimestamp(forecast['dt'])
+        forecasts_by_date.setdefault(forecast_time.date(), []).append((forecast_time, forecast))
+    dates = sorted(forecasts_by_date)
+    detail_dates = [d for d in target_dates if d in forecasts_by_date] if target_dates else dates[:1]
+    lines = [f"Data Cuaca untuk {weather_data['city']['name']}, {weather_data['city']['country']}"]
+    for date in dates:
+        day = [forecast for _, forecast in forecasts_by_date[date]]
+        temps = [f['main']['temp'] for f in day]
+        condition = Counter(f['weather'][0]['description'] for f in day).most_common(1)[0][0]
+        rain_slots = sum(1 for f in day if f['weather'][0]['main'] in RAIN_CONDITIONS)
+        lines.append(f"- {date.isoformat()}: {min(temps)}-{max(temps)}°C, {condition}, "
+                     f"{max(f['wind']['speed'] for f in day)}, {rain_slots}/{len(day)}")
+    for date in detail_dates:
+        for forecast_time, f in forecasts_by_date[date]:
+            lines.append(f"{forecast_time.strftime('%H:%M')}|{f['main']['temp']}|{f['main']['feels_like']}|"
+                         f"{f['main']['humidity']}|{f['wind']['speed']}|{f['weather'][0]['description']}")
+    return "\n".join(lines)
+
+
+def legacy_turn(weather_data, target_dates):
+    legacy_format_weather_data(weather_data)  # UI expander
+    legacy_format_weather_prompt(weather_data, target_dates)  # full_prompt
+    legacy_format_weather_data(weather_data)  # chat_entry
+
+
+def forecast_turn(weather_data, target_dates):
+    forecast = Forecast.from_json(weather_data)
+    forecast.to_text()  # UI expander
+    forecast.to_prompt(target_dates)  # full_prompt
+    forecast.to_text()  # chat_entry (memoized)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(DATA_PATH, encoding="utf-8") as f:
+        weather_data = json.load(f)
+    target_dates = [Forecast.from_json(weather_data).dates[1]]
+
+    results = {}
+    for name, turn in (("legacy", legacy_turn), ("forecast", forecast_turn)):
+        best = min(timeit.repeat(lambda: turn(weather_data, target_dates), number=args.turns, repeat=5))
+        results[name] = best / args.turns * 1e6
+        print(f"{name:>8}: {results[name]:8.1f} us/turn")
+    print(f" speedup: {results['legacy'] / results['forecast']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Cold-start cost: time to import the app's modules in a fresh interpreter.
+
+Each module is imported in its own subprocess (several times, best run kept) so nothing is
+shared between measurements. With the provider registry, importing models/pipeline no longer
+pulls in the provider SDKs; they load on first use or from the background preload.
+
+Usage: python benchmarks/bench_import.py [--repeat N] [--modules config models pipeline main]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SNIPPET = (
+    "import sys, time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start); "
+    "print(sum(name.split('.')[0] in ('groq', 'mistralai', 'google') for name in sys.modules))"
+)
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seconds, sdk_modules = result.stdout.split()
+    return float(seconds), int(sdk_modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=["config", "models", "pipeline", "main"])
+    args = parser.parse_args()
+
+    print(f"{'module':<12}{'best ms':>10}{'SDK modules loaded':>22}")
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(seconds for seconds, _ in runs)
+        print(f"{module:<12}{best * 1e3:>10.1f}{runs[0][1]:>22}")
+
+
+if __name__ == "__main__":
+    main()
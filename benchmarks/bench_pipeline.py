@@ -0,0 +1,200 @@
+"""Headless end-to-end benchmark of the chat pipeline against local stand-in providers.
+
+Drives main.py through Streamlit's AppTest with fake streaming LLMs (configurable TTFT,
+tokens/sec and error rate), a fake Gemini router and a local OpenWeatherMap endpoint that
+serves a recorded forecast. Reports per-stage latency, per-model TTFT, rendering cost and
+throughput for N concurrent sessions.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sessions 8 --turns 3
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from fakes import FakeForecastServer, FakeProvider, FakeRouter, StageRecorder  # noqa: E402
+
+MAIN_SCRIPT = os.path.join(ROOT, "main.py")
+
+PROMPTS = [
+    "Bagaimana cuaca di Jakarta hari ini?",
+    "Seperti apa cuaca disana besok?",
+    "Cuaca Surabaya 3 hari ke depan",
+    "Terima kasih!",
+    "Prakiraan cuaca Yogyakarta besok",
+    "Kalau di Bandung bagaimana?",
+    "Bandingkan cuaca Jakarta dan Bandung besok",
+]
+
+SECRETS = {
+    "MISTRAL_API_KEY": "offline",
+    "GROQ_API_KEY": "offline",
+    "GOOGLE_API_KEY": "offline",
+    "OPENWEATHER_API_KEY": "offline",
+    "MISTRAL_MODEL_NAME": "fake-mistral",
+    "MISTRAL_DISPLAY_NAME": "Mistral (fake)",
+    "MISTRAL_TEMPERATURE": 0.7,
+    "MISTRAL_MAX_TOKENS": 500,
+    "GEMINI_MODEL_NAME": "fake-gemini",
+    "GEMINI_DISPLAY_NAME": "Gemini (fake)",
+    "LLAMA_MODEL_NAME": "fake-llama",
+    "LLAMA_DISPLAY_NAME": "Llama (fake)",
+    "LLAMA_TEMPERATURE": 0.7,
+    "LLAMA_MAX_TOKENS": 500,
+    # Stand-in provider tidak punya kuota; yang diukur pipeline-nya, bukan antrean rate limit
+    "RATE_LIMIT_ENABLED": False,
+}
+
+# Tahap yang dibandingkan terhadap baseline (p50)
+COMPARED_STAGES = ("turn.total", "weather_fetch", "prompt_build", "render.flush", "render.history",
+                   "ttft.mistral", "ttft.gemini", "ttft.llama")
+
+
+def new_app(weather_url):
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=120)
+    for key, value in SECRETS.items():
+        at.secrets[key] = value
+    at.secrets["WEATHER_API_URL"] = weather_url
+    return at
+
+
+def install_fakes(recorder, args):
+    """Swap providers for local stand-ins and wrap pipeline stages with timers"""
+    import forecast
+    import lexicon
+    import models
+    import router
+    from providers import provider_registry
+    import ui
+    import weather_service
+
+    providers = {
+        "mistral": FakeProvider("mistral", recorder, args.ttft, args.tps, args.error_rate, seed=1),
+        "gemini": FakeProvider("gemini", recorder, args.ttft * 0.8, args.tps * 1.2, args.error_rate, seed=2),
+        "llama": FakeProvider("llama", recorder, args.ttft * 0.5, args.tps * 2, args.error_rate, seed=3),
+    }
+    models.ModelManager.initialize_clients = lambda self: None
+    for key, fake in providers.items():
+        provider_registry.get(key).stream = fake.stream
+    models.ModelManager.get_single_response = FakeRouter(recorder, args.router_latency).get_single_response
+
+    lexicon.QueryClassifier.classify = recorder.timed("routing.lexicon", lexicon.QueryClassifier.classify)
+    router.RouteCache.get = recorder.timed("routing.cache", router.RouteCache.get)
+    weather_service.WeatherService.get_weather_data_async = staticmethod(
+        recorder.timed("weather_fetch", weather_service.WeatherService.get_weather_data_async)
+    )
+    forecast.Forecast.to_prompt = recorder.timed("prompt_build", forecast.Forecast.to_prompt)
+    ui.StreamRenderer.flush = recorder.timed("render.flush", ui.StreamRenderer.flush)
+    ui.UI.display_chat_history = staticmethod(recorder.timed("render.history", ui.UI.display_chat_history))
+
+
+def clear_caches():
+    from forecast_cache import forecast_cache
+    from response_cache import response_cache
+    from router import route_cache
+
+    forecast_cache.clear()
+    response_cache.clear()
+    route_cache.clear()
+
+
+def run_session(index, args, weather_url, recorder, errors):
+    at = new_app(weather_url)
+    at.run()
+    for turn in range(args.turns):
+        if args.cold:
+            clear_caches()
+        prompt = PROMPTS[(index + turn) % len(PROMPTS)]
+        start = time.perf_counter()
+        at.chat_input[0].set_value(prompt).run()
+        recorder.record("turn.total", time.perf_counter() - start)
+        if at.exception:
+            errors.append(f"session {index} turn {turn}: {at.exception[0].value}")
+
+
+def compare(summary, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["stages"]
+    regressions = []
+    print(f"\n{'stage':<20}{'baseline p50':>14}{'current p50':>14}{'delta':>9}")
+    for stage in COMPARED_STAGES:
+        if stage not in summary or stage not in baseline:
+            continue
+        before, after = baseline[stage]["p50_ms"], summary[stage]["p50_ms"]
+        delta = (after - before) / before if before else 0.0
+        flag = "  REGRESSION" if delta > tolerance else ""
+        print(f"{stage:<20}{before:>12.1f}ms{after:>12.1f}ms{delta:>+8.0%}{flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--ttft", type=float, default=0.4, help="base time-to-first-token (s)")
+    parser.add_argument("--tps", type=float, default=60.0, help="base tokens per second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--router-latency", type=float, default=0.35)
+    parser.add_argument("--weather-latency", type=float, default=0.25)
+    parser.add_argument("--cold", action="store_true", help="clear forecast/route/answer caches before each turn")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    recorder = StageRecorder()
+    server = FakeForecastServer(recorder, args.weather_latency).start()
+    try:
+        # Run pertama mengimpor modul aplikasi; setelah itu provider bisa ditukar
+        new_app(server.url).run()
+        install_fakes(recorder, args)
+
+        errors = []
+        threads = [
+            threading.Thread(target=run_session, args=(i, args, server.url, recorder, errors))
+            for i in range(args.sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    summary = recorder.summary()
+    turns = args.sessions * args.turns
+    print(f"{'stage':<20}{'count':>7}{'mean':>11}{'p50':>11}{'p95':>11}")
+    for stage, stats in summary.items():
+        print(f"{stage:<20}{stats['count']:>7}{stats['mean_ms']:>9.1f}ms{stats['p50_ms']:>9.1f}ms{stats['p95_ms']:>9.1f}ms")
+    print(f"\nthroughput: {turns / elapsed:.2f} turns/s ({turns} turns, {args.sessions} sessions, {elapsed:.1f}s)")
+    for error in errors:
+        print(f"error: {error}")
+
+    result = {"args": vars(args), "throughput_turns_per_sec": turns / elapsed, "stages": summary}
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.compare and compare(summary, args.compare, args.tolerance):
+        sys.exit(1)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Local stand-ins for Mistral, Groq, Gemini and OpenWeatherMap used by the offline benchmarks."""
+import asyncio
+import copy
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from statistics import mean
+
+from aiohttp import web
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+FORECAST_STEP_SECONDS = 3 * 60 * 60
+
+
+class StageRecorder:
+    """Thread-safe collector of per-stage latencies (seconds)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def timed(self, stage, func):
+        """Wrap a sync or async callable so each call is recorded under stage"""
+        if asyncio.iscoroutinefunction(func):
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        else:
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def summary(self):
+        with self._lock:
+            return {stage: _describe(samples) for stage, samples in sorted(self._samples.items())}
+
+
+def _describe(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+class FakeProvider:
+    """Streaming LLM stand-in with configurable time-to-first-token, throughput and error rate"""
+
+    WORDS = ("cuaca", "hari", "ini", "cerah", "berawan", "dengan", "suhu", "sekitar", "derajat", "jangan",
+             "lupa", "bawa", "payung", "karena", "kemungkinan", "hujan", "sore")
+
+    def __init__(self, name, recorder, ttft=0.4, tokens_per_sec=60.0, error_rate=0.0, tokens=150, seed=None):
+        self.name = name
+        self.recorder = recorder
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+
+    async def stream(self, prompt, weather_data=None):
+        """Drop-in replacement for Provider.stream"""
+        start = time.perf_counter()
+        await asyncio.sleep(self.ttft)
+        if self.rng.random() < self.error_rate:
+            self.recorder.record(f"error.{self.name}", time.perf_counter() - start)
+            raise RuntimeError(f"simulated {self.name} failure")
+        self.recorder.record(f"ttft.{self.name}", time.perf_counter() - start)
+        for _ in range(self.tokens):
+            yield self.rng.choice(self.WORDS) + " "
+            await asyncio.sleep(1 / self.tokens_per_sec)
+        self.recorder.record(f"stream.{self.name}", time.perf_counter() - start)
+
+
+class FakeRouter:
+    """Stand-in for the Gemini router/extraction calls made through get_single_response"""
+
+    def __init__(self, recorder, latency=0.35):
+        self.recorder = recorder
+        self.latency = latency
+
+    async def get_single_response(self, model_type, prompt):
+        from lexicon import query_classifier, tokenize, WEATHER_KEYWORDS
+
+        start = time.perf_counter()
+        await asyncio.sleep(self.latency)
+        query = prompt.split('Current query: "', 1)[-1].split('"\n', 1)[0]
+        cities = [city.replace(" ", "%20") for city in query_classifier.find_cities(query)]
+        is_weather = any(word in WEATHER_KEYWORDS for word in tokenize(query))
+
+        if "Extract the city names" in prompt:
+            self.recorder.record("city_extraction", time.perf_counter() - start)
+            return ",".join(cities) or "lokasi%20tidak%20diketahui"
+        self.recorder.record("routing.llm", time.perf_counter() - start)
+        if "Return only \"yes\" or \"no\"" in prompt:
+            return "yes" if is_weather else "no"
+        return json.dumps({"is_weather": is_weather, "cities": cities, "target_date": None})
+
+
+class FakeForecastServer:
+    """Serves a recorded 5-day forecast on localhost, re-based to the current time"""
+
+    def __init__(self, recorder, latency=0.25, fixture="forecast_jakarta.json"):
+        self.recorder = recorder
+        self.latency = latency
+        with open(os.path.join(DATA_DIR, fixture), encoding="utf-8") as f:
+            self.fixture = json.load(f)
+        self.url = None
+        self._loop = None
+        self._runner = None
+
+    async def _handle(self, request):
+        await asyncio.sleep(self.latency)
+        data = copy.deepcopy(self.fixture)
+        data["city"]["name"] = request.query.get("q", data["city"]["name"]).title()
+        first_slot = int(time.time()) // FORECAST_STEP_SECONDS * FORECAST_STEP_SECONDS
+        offset = first_slot - data["list"][0]["dt"]
+        for entry in data["list"]:
+            entry["dt"] += offset
+        self.recorder.record("upstream.openweather", self.latency)
+        return web.json_response(data)
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_get("/forecast", self._handle)
+            self._runner = web.AppRunner(app)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            port = self._runner.addresses[0][1]
+            self.url = f"http://127.0.0.1:{port}/forecast"
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="fake-openweather", daemon=True).start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
@@ -1,28 +1,135 @@
-import streamlit as st
-
-# Model configurations loaded from secrets.toml
-MODELS = {
-    "mistral": {
-        "name": st.secrets["MISTRAL_MODEL_NAME"],
-        "display_name": st.secrets["MISTRAL_DISPLAY_NAME"],
-        "temperature": st.secrets["MISTRAL_TEMPERATURE"],
-        "max_tokens": st.secrets["MISTRAL_MAX_TOKENS"]
-    },
-    "gemini": {
-        "name": st.secrets["GEMINI_MODEL_NAME"],
-        "display_name": st.secrets["GEMINI_DISPLAY_NAME"]
-    },
-    "llama": {
-        "name": st.secrets["LLAMA_MODEL_NAME"],
-        "display_name": st.secrets["LLAMA_DISPLAY_NAME"],
-        "temperature": st.secrets["LLAMA_TEMPERATURE"],
-        "max_tokens": st.secrets["LLAMA_MAX_TOKENS"]
-    }
+import json
+import os
+
+try:
+    import streamlit as st
+except ImportError:  # server headless bisa jalan tanpa Streamlit, cukup dari environment
+    st = None
+
+_MISSING = object()
+
+
+def get_secret(key, default=_MISSING):
+    """Read a setting from the environment first, then from Streamlit secrets (.streamlit/secrets.toml)
+
+    Environment values are parsed as JSON when possible, so "true", "0.5" or '{"mistral": 45}' keep their types.
+    """
+    if key in os.environ:
+        value = os.environ[key]
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    if st is not None:
+        try:
+            return st.secrets[key]
+        except Exception:
+            # Key tidak ada, atau secrets.toml tidak ada sama sekali
+            pass
+    if default is _MISSING:
+        raise KeyError(f"Missing {key} in environment or secrets.toml")
+    return default
+
+
+def has_secret(key):
+    return get_secret(key, None) is not None
+
+
+# Settings read lazily on first access (see __getattr__ below): name -> default
+_SETTINGS = {
+    # Models to show, in column order; each reads <KEY>_MODEL_NAME, <KEY>_DISPLAY_NAME and optional
+    # <KEY>_TEMPERATURE / <KEY>_MAX_TOKENS. Extra providers: [MODEL_PLUGINS] key = "module:Class"
+    "ENABLED_MODELS": ["mistral", "gemini", "llama"],
+    # Model for intent routing and city extraction (does not have to be enabled for answers)
+    "ROUTER_MODEL": "gemini",
+
+    # API configurations
+    "WEATHER_API_URL": _MISSING,
+
+    # OpenWeatherMap HTTP client: total timeout (s), retries, backoff base (s), max concurrent requests
+    "WEATHER_API_TIMEOUT": 10,
+    "WEATHER_API_RETRIES": 2,
+    "WEATHER_API_BACKOFF": 0.5,
+    "WEATHER_API_MAX_CONCURRENCY": 8,
+
+    # Forecast cache: LRU size, TTL bounds in seconds, optional SQLite file that survives restarts
+    "FORECAST_CACHE_SIZE": 64,
+    "FORECAST_CACHE_MIN_TTL": 600,
+    "FORECAST_CACHE_MAX_TTL": 10800,
+    "FORECAST_CACHE_DB": "",
+
+    # Start the forecast fetch for a likely city while the LLM router is still classifying the query
+    "SPECULATIVE_PREFETCH": True,
+
+    # Cities compared in one turn ("bandingkan cuaca Jakarta dan Bandung"); extra cities are reported as unavailable
+    "WEATHER_MAX_CITIES": 4,
+
+    # Answer cache: replay identical answers within the forecast window; list model keys to bypass
+    "RESPONSE_CACHE_ENABLED": True,
+    "RESPONSE_CACHE_BYPASS": [],
+    "RESPONSE_CACHE_SIZE": 256,
+    "RESPONSE_CACHE_MAX_CHARS": 2_000_000,
+    "RESPONSE_CACHE_TTL": 600,
+
+    # Local pre-classifier: minimum confidence for answering a query without the LLM router
+    "LEXICON_MIN_CONFIDENCE": 0.9,
+
+    # Routing decision cache size (decisions shared by all sessions in the process)
+    "ROUTE_CACHE_SIZE": 1024,
+
+    # Streaming render budget: re-render a response pane at most every N ms unless N chars are pending
+    "RENDER_INTERVAL_MS": 50,
+    "RENDER_MIN_CHARS": 200,
+
+    # Chat history: turns rendered fully on each rerun, per-session memory cap (chars), LLM context messages kept
+    "HISTORY_FULL_TURNS": 3,
+    "SESSION_MEMORY_MAX_CHARS": 500_000,
+    "MESSAGE_HISTORY_LIMIT": 10,
+
+    # Conversation context budgets (estimated tokens) for router/extraction prompts and answer prompts;
+    # optionally prepend one-sentence gists of older messages, up to CONTEXT_SUMMARY_TOKENS
+    "CONTEXT_ROUTER_TOKENS": 300,
+    "CONTEXT_ANSWER_TOKENS": 1200,
+    "CONTEXT_SUMMARY": False,
+    "CONTEXT_SUMMARY_TOKENS": 150,
+
+    # Headless HTTP server (server.py): bind address, in-memory session store size and idle expiry (s)
+    "SERVER_HOST": "0.0.0.0",
+    "SERVER_PORT": 8080,
+    "SESSION_STORE_MAX_SESSIONS": 10_000,
+    "SESSION_IDLE_TTL": 3600,
+
+    # Provider fan-out: "all" or "first_good", per-model deadlines (s), and health limits over a rolling window (s)
+    # Models whose p95 latency (0 = no limit) or error rate exceeds the limit are skipped until their samples age out
+    "FANOUT_MODE": "all",
+    "PROVIDER_DEADLINES": {},
+    "PROVIDER_DEFAULT_DEADLINE": 60,
+    "FANOUT_MAX_P95": 0,
+    "FANOUT_MAX_ERROR_RATE": 0.5,
+    "FANOUT_MIN_MODELS": 1,
+    "PROVIDER_HEALTH_WINDOW": 300,
+    "PROVIDER_HEALTH_MIN_SAMPLES": 5,
+
+    # Shared upstream guards: requests per minute per upstream (model key or "openweather"; unlisted = no limit),
+    # bucket size, longest queue wait (s) before rejecting, and circuit breaker trip count (0 = off) / open time (s)
+    "RATE_LIMIT_ENABLED": True,
+    "RATE_LIMIT_RPM": {"gemini": 15, "mistral": 60, "llama": 30, "openweather": 60},
+    "RATE_LIMIT_BURST": 3,
+    "RATE_LIMIT_MAX_WAIT": 10,
+    "BREAKER_FAILURE_THRESHOLD": 5,
+    "BREAKER_COOLDOWN": 30,
+
+    # Tracing: spans and provider metrics; fraction of turns written to the JSONL trace file, Prometheus port (0 = off)
+    # and bind address (loopback by default; set 0.0.0.0 only behind a firewall)
+    "TRACE_ENABLED": False,
+    "TRACE_SAMPLE_RATE": 1.0,
+    "TRACE_FILE": "",
+    "METRICS_HOST": "127.0.0.1",
+    "METRICS_PORT": 0,
 }
 
 # API configurations
-WEATHER_API_URL = st.secrets["WEATHER_API_URL"]
-REQUIRED_API_KEYS = ['MISTRAL_API_KEY', 'GROQ_API_KEY', 'GOOGLE_API_KEY', 'OPENWEATHER_API_KEY']
+REQUIRED_API_KEYS = ['OPENWEATHER_API_KEY']  # kunci API provider dideklarasikan oleh plugin masing-masing
 
 # UI configurations
 PAGE_CONFIG = {
@@ -31,6 +138,41 @@ PAGE_CONFIG = {
     "layout": "wide"
 }
 
+
+def model_settings(key):
+    """Settings of one model key from <KEY>_MODEL_NAME, <KEY>_DISPLAY_NAME, ..."""
+    prefix = key.upper()
+    return {
+        "name": get_secret(f"{prefix}_MODEL_NAME"),
+        "display_name": get_secret(f"{prefix}_DISPLAY_NAME"),
+        "temperature": get_secret(f"{prefix}_TEMPERATURE", None),
+        "max_tokens": get_secret(f"{prefix}_MAX_TOKENS", None)
+    }
+
+
+# Setting yang perlu diolah dulu setelah dibaca
+_COMPUTED = {
+    # Model configurations loaded from the environment or secrets.toml
+    "MODELS": lambda: {key: model_settings(key) for key in __getattr__("ENABLED_MODELS")},
+    "MODEL_PLUGINS": lambda: dict(get_secret("MODEL_PLUGINS", {})),
+    "RESPONSE_CACHE_BYPASS": lambda: list(get_secret("RESPONSE_CACHE_BYPASS", [])),
+    "PROVIDER_DEADLINES": lambda: dict(get_secret("PROVIDER_DEADLINES", {})),
+    "RATE_LIMIT_RPM": lambda: dict(get_secret("RATE_LIMIT_RPM", _SETTINGS["RATE_LIMIT_RPM"])),
+}
+
+
+def __getattr__(name):
+    """Resolve a setting on first access and cache it as a module global"""
+    if name in _COMPUTED:
+        value = _COMPUTED[name]()
+    elif name in _SETTINGS:
+        value = get_secret(name, _SETTINGS[name])
+    else:
+        raise AttributeError(f"module 'config' has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
 # Prompt templates
 WEATHER_ANALYSIS_PROMPT = """
 Previous conversation:
@@ -57,14 +199,15 @@ Previous conversation:
 
 Current query: "{prompt}"
 
-Extract the city name being discussed. Consider:
-1. If the query uses words like "disana", "disitu", "di kota itu", extract the last mentioned city from the conversation
-2. If a new city is mentioned explicitly, use that instead
-3. Return "lokasi%20tidak%20diketahui" if no city can be determined
-4. Convert multi-word city names using '%20' (e.g., "new york" → "new%20york")
-5. Use common names for aliases (e.g., "jogja" → "yogyakarta")
+Extract the city names being discussed. Consider:
+1. If the query uses words like "disana", "disitu", "di kota itu", extract the last mentioned city (or cities) from the conversation
+2. If new cities are mentioned explicitly, use those instead
+3. If the query compares several cities, return all of them separated by commas (e.g., "jakarta,bandung")
+4. Return "lokasi%20tidak%20diketahui" if no city can be determined
+5. Convert multi-word city names using '%20' (e.g., "new york" → "new%20york")
+6. Use common names for aliases (e.g., "jogja" → "yogyakarta")
 
-Return ONLY the city name without any additional text.
+Return ONLY the comma-separated city names without any additional text.
 """
 
 WEATHER_RESPONSE_PROMPT = """
@@ -78,6 +221,7 @@ Berdasarkan data cuaca berikut, berikan respons yang natural dan informatif:
 {weather_info}
 
 Pahami dengan teliti apa yang ditanyakan user. Jika tanggal yang ditanyakan tidak ada di dalam data, sampaikan saja tidak tahu. 
+Jika data berisi beberapa kota, bandingkan kota-kota tersebut secara ringkas.
 Berikan analisis singkat tentang kondisi cuaca dan saran yang relevan berdasarkan data tersebut. 
 Gunakan bahasa yang ramah dan mudah dipahami.
 """
@@ -91,4 +235,29 @@ Current query: "{prompt}"
 Berikan respons yang ramah dan natural untuk pesan pengguna di atas.
 Gunakan bahasa Indonesia yang sopan dan informal. 
 Anda adalah asisten AI yang dapat memberikan informasi cuaca, tetapi juga bisa bercakap-cakap tentang topik umum.
-"""
\ No newline at end of file
+"""
+QUERY_ROUTER_PROMPT = """
+Previous conversation:
+{context}
+
+Current query: "{prompt}"
+
+Today's date: {today}
+
+Analyze the query and return ONLY a JSON object with exactly these keys:
+- "is_weather": true if the query asks about weather information, otherwise false.
+  Treat references like "disana", "disitu", "di kota itu" as weather queries if they refer to previously mentioned locations.
+- "cities": list of the cities being discussed (several when the query compares cities), or [] if none can be determined.
+  If the query uses words like "disana", "disitu", "di kota itu", use the last mentioned city (or cities) from the conversation.
+  If new cities are mentioned explicitly, use those instead.
+  Convert multi-word city names using '%20' (e.g., "new york" → "new%20york").
+  Use common names for aliases (e.g., "jogja" → "yogyakarta").
+- "target_date": the date the user asks about in YYYY-MM-DD format relative to today's date, or null if not specified.
+
+Examples:
+"What's the weather like in New York?" → {{"is_weather": true, "cities": ["new%20york"], "target_date": null}}
+"Prakiraan cuaca Yogyakarta besok" → {{"is_weather": true, "cities": ["yogyakarta"], "target_date": "{tomorrow}"}}
+"Bandingkan cuaca Jakarta dan Bandung" → {{"is_weather": true, "cities": ["jakarta", "bandung"], "target_date": null}}
+"Where is Tokyo?" → {{"is_weather": false, "cities": ["tokyo"], "target_date": null}}
+"Hi" → {{"is_weather": false, "cities": [], "target_date": null}}
+"""
@@ -0,0 +1,118 @@
+import re
+from collections import deque
+from typing import Dict
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+GIST_MAX_CHARS = 160
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for Latin-script text); no tokenizer needed"""
+    return (len(text) + 3) // 4
+
+
+def _gist(content: str) -> str:
+    """Extractive summary of one message: its first sentence, clipped"""
+    first = _SENTENCE_END.split(" ".join(content.split()), 1)[0]
+    return first if len(first) <= GIST_MAX_CHARS else first[:GIST_MAX_CHARS - 1].rstrip() + "…"
+
+
+class _Message:
+    __slots__ = ("role", "content", "tokens", "gist", "gist_tokens")
+
+    def __init__(self, role: str, content: str):
+        self.role = "Assistant" if role == "assistant" else "Human"
+        self.content = content
+        self.tokens = count_tokens(self.line(content))
+        self.gist = _gist(content)
+        self.gist_tokens = count_tokens(self.line(self.gist))
+
+    def line(self, text: str) -> str:
+        return f"{self.role}: {text}"
+
+
+class ConversationContext:
+    """Rolling conversation window rendered newest-first into a token budget
+
+    Token counts are computed once per message when it is added. Messages that no longer fit the
+    budget (or were dropped after max_messages) can contribute a cached one-sentence gist instead,
+    so the prompt stays roughly the same size however long the conversation gets. Gists of dropped
+    messages are kept up to summary_tokens, independent of max_messages.
+    """
+
+    def __init__(self, max_messages: int = 10, summary: bool = False, summary_tokens: int = 150):
+        self.max_messages = max_messages
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+        self._messages = deque()
+        self._evicted = deque()  # (baris gist, token) pesan yang sudah keluar dari jendela
+        self._evicted_tokens = 0
+        self._rendered: Dict[int, str] = {}
+
+    def add(self, role: str, content: str):
+        self._messages.append(_Message(role, content))
+        while len(self._messages) > self.max_messages:
+            self._evict(self._messages.popleft())
+        self._rendered.clear()
+
+    def _evict(self, message: _Message):
+        if not self.summary:
+            return
+        self._evicted.append((message.line(message.gist), message.gist_tokens))
+        self._evicted_tokens += message.gist_tokens
+        # Gist yang lebih tua dari summary_tokens tidak akan pernah ikut dirender
+        while self._evicted_tokens > self.summary_tokens:
+            self._evicted_tokens -= self._evicted.popleft()[1]
+
+    def __len__(self):
+        return len(self._messages)
+
+    def render(self, budget: int) -> str:
+        """Most recent messages that fit in budget tokens, preceded by gists of older ones when enabled"""
+        cached = self._rendered.get(budget)
+        if cached is not None:
+            return cached
+
+        lines = []
+        used = 0
+        window = list(self._messages)
+        first = 0  # indeks pesan tertua yang masuk utuh (atau terpotong)
+        for index in range(len(window) - 1, -1, -1):
+            message = window[index]
+            if used + message.tokens <= budget:
+                lines.append(message.line(message.content))
+                used += message.tokens
+                continue
+            if lines:
+                first = index + 1
+            else:
+                # Pesan terbaru sendiri melebihi budget: potong saja isinya
+                room = max(0, budget - count_tokens(message.line(""))) * 4
+                lines.append(message.line(message.content[:room].rstrip() + "…"))
+                used = budget
+                first = index
+            break
+        lines.reverse()
+        older = list(self._evicted)
+        older.extend((message.line(message.gist), message.gist_tokens) for message in window[:first])
+
+        if self.summary and older:
+            gists = []
+            gist_budget = min(self.summary_tokens, budget - used)
+            for gist, gist_tokens in reversed(older):
+                if gist_tokens > gist_budget:
+                    break
+                gists.append(f"({gist})")
+                gist_budget -= gist_tokens
+            gists.reverse()
+            lines = gists + lines
+
+        text = "\n".join(lines)
+        self._rendered[budget] = text
+        return text
+
+    def clear(self):
+        self._messages.clear()
+        self._evicted.clear()
+        self._evicted_tokens = 0
+        self._rendered.clear()
@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+from config import (
+    FANOUT_MODE, PROVIDER_DEADLINES, PROVIDER_DEFAULT_DEADLINE, FANOUT_MAX_P95, FANOUT_MAX_ERROR_RATE,
+    FANOUT_MIN_MODELS, PROVIDER_HEALTH_WINDOW, PROVIDER_HEALTH_MIN_SAMPLES
+)
+
+FANOUT_MODES = ("all", "first_good")
+
+# Catatan yang ditampilkan di panel model yang tidak menghasilkan jawaban penuh
+NOTICES = {
+    "timeout": "\n\n_[Tidak merespons dalam {deadline:g} detik]_",
+    "cancelled": "\n\n_[Dihentikan: jawaban model lain sudah selesai]_",
+    "skipped": "_[Dilewati sementara: latensi atau tingkat error sedang tinggi]_",
+    "unavailable": "_[{label} sedang dibatasi (rate limit) atau tidak tersedia, coba lagi sebentar lagi]_",
+}
+
+
+class ProviderHealth:
+    """Rolling per-model latency and error samples from the last window_seconds"""
+
+    def __init__(self, window_seconds: float = 300, max_samples: int = 200):
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model_type: str, latency: float, ok: bool):
+        with self._lock:
+            samples = self._samples.setdefault(model_type, deque(maxlen=self.max_samples))
+            samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self, model_type: str) -> List[tuple]:
+        # Sampel lama kedaluwarsa, jadi provider yang sempat dilewati otomatis dicoba lagi
+        cutoff = time.monotonic() - self.window_seconds
+        samples = self._samples.get(model_type)
+        if not samples:
+            return []
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return list(samples)
+
+    def snapshot(self, model_type: str) -> Dict:
+        """Sample count, p95 latency (seconds) and error rate within the window"""
+        with self._lock:
+            samples = self._recent(model_type)
+        if not samples:
+            return {"samples": 0, "p95": None, "error_rate": 0.0}
+        latencies = sorted(latency for _, latency, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            "samples": len(samples),
+            "p95": latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)],
+            "error_rate": errors / len(samples),
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            models = list(self._samples)
+        stats = {}
+        for model_type in models:
+            snapshot = self.snapshot(model_type)
+            stats[f"{model_type}_samples"] = snapshot["samples"]
+            stats[f"{model_type}_p95_seconds"] = snapshot["p95"] or 0.0
+            stats[f"{model_type}_error_rate"] = snapshot["error_rate"]
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class FanoutPolicy:
+    """Which models to ask, how long to wait for each, and which answer goes into the history
+
+    mode "all" waits for every selected model (each bounded by its deadline); "first_good"
+    cancels the remaining streams as soon as one model finishes cleanly.
+    """
+
+    def __init__(self, health: ProviderHealth, mode: str = "all", deadlines: Optional[Dict[str, float]] = None,
+                 default_deadline: float = 60, max_p95: float = 0, max_error_rate: float = 0.5,
+                 min_models: int = 1, min_samples: int = 5):
+        if mode not in FANOUT_MODES:
+            raise ValueError(f"Unknown fan-out mode {mode!r}, expected one of {FANOUT_MODES}")
+        self.health = health
+        self.mode = mode
+        self.deadlines = dict(deadlines or {})
+        self.default_deadline = default_deadline
+        self.max_p95 = max_p95
+        self.max_error_rate = max_error_rate
+        self.min_models = min_models
+        self.min_samples = min_samples
+
+    def deadline(self, model_type: str) -> float:
+        return self.deadlines.get(model_type, self.default_deadline)
+
+    def is_healthy(self, model_type: str) -> bool:
+        snapshot = self.health.snapshot(model_type)
+        if snapshot["samples"] < self.min_samples:
+            return True
+        if snapshot["error_rate"] > self.max_error_rate:
+            return False
+        return not (self.max_p95 and snapshot["p95"] > self.max_p95)
+
+    def select(self, model_types: Iterable[str]) -> List[str]:
+        """Healthy models in their original order, topped up with the least-bad ones to min_models"""
+        model_types = list(model_types)
+        selected = {model_type for model_type in model_types if self.is_healthy(model_type)}
+        if len(selected) < self.min_models:
+            def badness(model_type):
+                snapshot = self.health.snapshot(model_type)
+                return snapshot["error_rate"], snapshot["p95"] or 0.0
+            for model_type in sorted(model_types, key=badness):
+                if len(selected) >= self.min_models:
+                    break
+                selected.add(model_type)
+        return [model_type for model_type in model_types if model_type in selected]
+
+
+class FanoutResult:
+    """Per-model text and status of one fan-out, in completion order"""
+    __slots__ = ("responses", "statuses", "latencies", "finish_order", "skipped")
+
+    def __init__(self, skipped: List[str]):
+        self.responses: Dict[str, str] = {}
+        self.statuses: Dict[str, str] = {}  # ok, error, timeout, cancelled
+        self.latencies: Dict[str, float] = {}
+        self.finish_order: List[str] = []
+        self.skipped = skipped
+
+    def record(self, model_type: str, status: str, text: str, latency: float):
+        self.responses[model_type] = text
+        self.statuses[model_type] = status
+        self.latencies[model_type] = latency
+        self.finish_order.append(model_type)
+
+    @property
+    def canonical(self) -> Optional[str]:
+        """The first model that finished cleanly, used as the assistant answer in the history"""
+        for model_type in self.finish_order:
+            if self.statuses[model_type] == "ok" and self.responses[model_type].strip():
+                return model_type
+        return None
+
+
+provider_health = ProviderHealth(PROVIDER_HEALTH_WINDOW)
+fanout_policy = FanoutPolicy(
+    provider_health,
+    mode=FANOUT_MODE,
+    deadlines=PROVIDER_DEADLINES,
+    default_deadline=PROVIDER_DEFAULT_DEADLINE,
+    max_p95=FANOUT_MAX_P95,
+    max_error_rate=FANOUT_MAX_ERROR_RATE,
+    min_models=FANOUT_MIN_MODELS,
+    min_samples=PROVIDER_HEALTH_MIN_SAMPLES
+)
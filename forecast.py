@@ -0,0 +1,198 @@
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Kondisi yang dihitung sebagai slot hujan di ringkasan harian
+RAIN_CONDITIONS = {"Rain", "Drizzle", "Thunderstorm"}
+
+
+class ForecastSlot:
+    """One 3-hour forecast entry"""
+
+    __slots__ = ("time", "temp", "feels_like", "humidity", "pressure", "wind_speed", "condition", "condition_main")
+
+    def __init__(self, entry: Dict):
+        self.time = datetime.fromtimestamp(entry['dt'])
+        self.temp = entry['main']['temp']
+        self.feels_like = entry['main']['feels_like']
+        self.humidity = entry['main']['humidity']
+        self.pressure = entry['main']['pressure']
+        self.wind_speed = entry['wind']['speed']
+        self.condition = entry['weather'][0]['description']
+        self.condition_main = entry['weather'][0]['main']
+
+    def key(self) -> tuple:
+        return (self.time, self.temp, self.feels_like, self.humidity, self.pressure, self.wind_speed, self.condition)
+
+    @property
+    def is_rain(self) -> bool:
+        return self.condition_main in RAIN_CONDITIONS
+
+
+# View teks per Forecast: beberapa tanggal target x hari; yang jarang dipakai dibuang lebih dulu
+MAX_VIEWS = 8
+
+
+class Forecast:
+    """OpenWeatherMap 5-day forecast parsed once, with memoized text views (a small LRU of MAX_VIEWS)"""
+
+    __slots__ = ("city_name", "country_code", "slots", "by_date", "snapshot_id", "_views", "_summaries", "_lock")
+
+    def __init__(self, city_name: str, country_code: str, slots: List[ForecastSlot]):
+        self.city_name = city_name
+        self.country_code = country_code
+        self.slots = slots
+        self.by_date: Dict[date, List[ForecastSlot]] = {}
+        for slot in slots:
+            self.by_date.setdefault(slot.time.date(), []).append(slot)
+        # Berubah setiap kali isi prakiraan berubah; dipakai sebagai bagian key cache jawaban
+        # Stabil antar proses (hash() bawaan diacak per proses), jadi aman untuk cache bersama
+        self.snapshot_id = hashlib.sha1(
+            repr((city_name, country_code, [slot.key() for slot in slots])).encode("utf-8")
+        ).hexdigest()
+        self._views: "OrderedDict[tuple, str]" = OrderedDict()
+        self._summaries: Dict[date, tuple] = {}  # paling banyak satu per hari dalam prakiraan
+        self._lock = threading.Lock()  # Forecast dari cache dipakai bersama oleh beberapa sesi
+
+    @classmethod
+    def from_json(cls, weather_data: Dict) -> "Forecast":
+        return cls(
+            weather_data['city']['name'],
+            weather_data['city']['country'],
+            [ForecastSlot(entry) for entry in weather_data['list']]
+        )
+
+    @property
+    def location(self) -> str:
+        return f"{self.city_name}, {self.country_code}"  # Format: "Jakarta, ID"
+
+    @property
+    def dates(self) -> List[date]:
+        return sorted(self.by_date)
+
+    def day_summary(self, day: date) -> Tuple[float, float, str, float, int, int]:
+        """(min temp, max temp, dominant condition, max wind, rain slots, slots) of one day"""
+        if day not in self._summaries:
+            slots = self.by_date[day]
+            temps = [slot.temp for slot in slots]
+            self._summaries[day] = (
+                min(temps),
+                max(temps),
+                Counter(slot.condition for slot in slots).most_common(1)[0][0],
+                max(slot.wind_speed for slot in slots),
+                sum(1 for slot in slots if slot.is_rain),
+                len(slots),
+            )
+        return self._summaries[day]
+
+    def to_text(self, current_date: Optional[date] = None) -> str:
+        """Full verbose forecast for the UI expander and chat history"""
+        current_date = current_date or datetime.now().date()
+        key = ("text", current_date)
+        view = self._view(key)
+        if view is None:
+            parts = [f"Data Cuaca untuk {self.location}:\n\n"]
+            for day in self.dates[:5]:
+                if day == current_date:
+                    parts.append(f"\n📅 Hari ini ({day.strftime('%d %B %Y')})\n")
+                else:
+                    parts.append(f"\n📅 {(day - current_date).days} hari ke depan ({day.strftime('%d %B %Y')})\n")
+                parts.extend(self._format_slot(slot) for slot in self.by_date[day])
+            view = self._remember(key, "".join(parts).strip())
+        return view
+
+    def to_prompt(self, target_dates: Iterable[date] = (), current_date: Optional[date] = None) -> str:
+        """Compact forecast for LLM prompts: per-day summary plus 3-hour rows only for target_dates"""
+        current_date = current_date or datetime.now().date()
+        target_dates = tuple(sorted(set(target_dates)))
+        key = ("prompt", current_date, target_dates)
+        view = self._view(key)
+        if view is None:
+            dates = self.dates
+            detail_dates = [d for d in target_dates if d in self.by_date] if target_dates else dates[:1]
+
+            lines = [
+                f"Data Cuaca untuk {self.location} (suhu °C, angin m/s)",
+                "Ringkasan harian:",
+            ]
+            for day in dates:
+                low, high, condition, wind, rain_slots, total = self.day_summary(day)
+                lines.append(
+                    f"- {day.isoformat()} ({self._day_label(day, current_date)}): "
+                    f"{low}-{high}°C, dominan {condition}, "
+                    f"angin maks {wind}, hujan {rain_slots}/{total} slot"
+                )
+
+            if detail_dates:
+                lines.append("Detail per 3 jam (jam|suhu|terasa|lembab%|angin|kondisi):")
+                for day in detail_dates:
+                    lines.append(f"{day.isoformat()} ({self._day_label(day, current_date)}):")
+                    lines.extend(
+                        f"{slot.time.strftime('%H:%M')}|{slot.temp}|{slot.feels_like}|"
+                        f"{slot.humidity}|{slot.wind_speed}|{slot.condition}"
+                        for slot in self.by_date[day]
+                    )
+            view = self._remember(key, "\n".join(lines))
+        return view
+
+    def _view(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+            return view
+
+    def _remember(self, key: tuple, view: str) -> str:
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > MAX_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    @staticmethod
+    def _day_label(day: date, current_date: date) -> str:
+        days_ahead = (day - current_date).days
+        if days_ahead == 0:
+            return "Hari ini"
+        if days_ahead == 1:
+            return "Besok"
+        return f"{days_ahead} hari ke depan"
+
+    @staticmethod
+    def _format_slot(slot: ForecastSlot) -> str:
+        return f"""
+⏰ Pukul {slot.time.strftime('%H:%M')}
+🌡️ Suhu: {slot.temp}°C
+🌡️ Terasa seperti: {slot.feels_like}°C
+💧 Kelembaban: {slot.humidity}%
+💨 Kecepatan Angin: {slot.wind_speed} m/s
+🌥️ Kondisi: {slot.condition}
+📊 Tekanan: {slot.pressure} hPa
+---"""
+
+
+def comparison_table(forecasts: Iterable[Forecast], target_dates: Iterable[date] = (),
+                     current_date: Optional[date] = None) -> str:
+    """One compact per-day, per-city table for comparing several forecasts in a single prompt
+
+    Only the dates asked about are listed (all dates when none of them is in the data); the
+    3-hour rows of Forecast.to_prompt are left out so the prompt grows by one row per city per day.
+    """
+    current_date = current_date or datetime.now().date()
+    forecasts = list(forecasts)
+    dates = sorted(set().union(*(forecast.by_date for forecast in forecasts)))
+    dates = [day for day in sorted(set(target_dates)) if day in dates] or dates
+
+    lines = [
+        "Perbandingan cuaca per kota (suhu °C, angin m/s, hujan = slot 3 jam berhujan/jumlah slot)",
+        "tanggal|kota|suhu min-maks|kondisi dominan|angin maks|hujan",
+    ]
+    for day in dates:
+        label = f"{day.isoformat()} ({Forecast._day_label(day, current_date)})"
+        for forecast in forecasts:
+            if day in forecast.by_date:
+                low, high, condition, wind, rain_slots, total = forecast.day_summary(day)
+                lines.append(f"{label}|{forecast.location}|{low}-{high}|{condition}|{wind}|{rain_slots}/{total}")
+    return "\n".join(lines)
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import unquote
+from config import FORECAST_CACHE_SIZE, FORECAST_CACHE_MIN_TTL, FORECAST_CACHE_MAX_TTL, FORECAST_CACHE_DB
+from lexicon import CITY_ALIASES
+from lru import LRUCache
+from runtime import submit
+
+# OpenWeatherMap 5 day / 3 hour forecast: satu slot tiap 3 jam
+FORECAST_STEP_SECONDS = 3 * 60 * 60
+
+
+def city_cache_key(city: str) -> str:
+    """Collapse case, '%20' encoding, whitespace and aliases into one cache key"""
+    key = " ".join(unquote(city).lower().split())
+    return CITY_ALIASES.get(key, key)
+
+
+def forecast_expiry(weather_data: Dict, now: float, min_ttl: float, max_ttl: float) -> float:
+    """Expire at the next 3-hour slot boundary of the forecast, clamped to [min_ttl, max_ttl]"""
+    try:
+        first_slot = weather_data["list"][0]["dt"]
+    except (KeyError, IndexError, TypeError):
+        return now + min_ttl
+    steps = max(0, int((now - first_slot) // FORECAST_STEP_SECONDS) + 1)
+    next_boundary = first_slot + steps * FORECAST_STEP_SECONDS
+    return min(max(next_boundary, now + min_ttl), now + max_ttl)
+
+
+class ForecastCache:
+    """Process-wide LRU + TTL cache for forecasts with single-flight fetches and an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = 64, min_ttl: float = 600, max_ttl: float = FORECAST_STEP_SECONDS,
+                 db_path: Optional[str] = None):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.db_path = db_path
+        self._entries = LRUCache(max_entries, counters=("disk_hits", "coalesced", "upstream_fetches"))
+        self._inflight: Dict[str, Future] = {}
+        if db_path:
+            self._init_db()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh cached forecast or None"""
+        value = self._entries.get(key)
+        if value is None:
+            value = self._get_disk(key)
+        return value
+
+    def set(self, key: str, value: Dict):
+        now = time.time()
+        expires_at = forecast_expiry(value, now, self.min_ttl, self.max_ttl)
+        self._entries.set(key, value, expires_at)
+        self._set_disk(key, value, expires_at)
+
+    def expires_at(self, key: str) -> Optional[float]:
+        return self._entries.expires_at(key)
+
+    async def get_or_fetch_async(self, key: str, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """Return the cached forecast, or fetch it once even if several sessions ask concurrently
+
+        Waiters may live on other sessions' event loops.
+        """
+        future, leader = self._claim(key)
+        if future is None:
+            return leader
+        if leader:
+            # Fetch berjalan di background loop supaya tetap selesai (dan mengisi cache)
+            # walau sesi pemanggilnya dibatalkan atau loop-nya berhenti
+            submit(self._fill_async(key, future, fetch))
+        # Shield: membatalkan satu pemanggil tidak boleh membatalkan future bersama
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    async def _fill_async(self, key: str, future: Future, fetch):
+        try:
+            value = self._get_disk(key)
+            if value is None:
+                self._entries.count("upstream_fetches")
+                value = await fetch()
+                if value is not None:
+                    self.set(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._entries.lock:
+                self._inflight.pop(key, None)
+
+    def _claim(self, key: str):
+        """Return (None, value) on a memory hit, otherwise (future, is_leader)"""
+        with self._entries.lock:
+            value = self._entries.get(key)
+            if value is not None:
+                return None, value
+            future = self._inflight.get(key)
+            if future is not None:
+                self._entries.count("coalesced")
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecasts (key TEXT PRIMARY KEY, expires_at REAL, payload TEXT)"
+            )
+
+    def _get_disk(self, key: str) -> Optional[Dict]:
+        if not self.db_path:
+            return None
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT expires_at, payload FROM forecasts WHERE key = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        expires_at, payload = row
+        value = json.loads(payload)
+        self._entries.set(key, value, expires_at)
+        self._entries.count("disk_hits")
+        return value
+
+    def _set_disk(self, key: str, value: Dict, expires_at: float):
+        if not self.db_path:
+            return
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("DELETE FROM forecasts WHERE expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "INSERT OR REPLACE INTO forecasts (key, expires_at, payload) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(value))
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters and current size"""
+        return self._entries.stats()
+
+    def clear(self):
+        self._entries.clear()
+        if self.db_path:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.execute("DELETE FROM forecasts")
+            except sqlite3.Error:
+                pass
+
+
+forecast_cache = ForecastCache(
+    max_entries=FORECAST_CACHE_SIZE,
+    min_ttl=FORECAST_CACHE_MIN_TTL,
+    max_ttl=FORECAST_CACHE_MAX_TTL,
+    db_path=FORECAST_CACHE_DB or None
+)
@@ -0,0 +1,290 @@
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import LEXICON_MIN_CONFIDENCE
+
+# Kata kunci cuaca (bahasa Indonesia + beberapa istilah Inggris yang sering dipakai)
+WEATHER_KEYWORDS = [
+    "cuaca", "prakiraan", "ramalan", "prediksi cuaca", "hujan", "gerimis", "badai", "petir",
+    "mendung", "berawan", "cerah", "panas", "dingin", "gerah", "suhu", "temperatur",
+    "kelembaban", "lembab", "angin", "kabut", "weather", "forecast", "rain", "temperature",
+]
+
+# Rujukan ke lokasi sebelumnya, harus diserahkan ke LLM karena butuh konteks percakapan
+ANAPHORA = [
+    "disana", "di sana", "disitu", "di situ", "kesana", "ke sana", "kota itu", "kota tersebut",
+    "daerah itu", "daerah sana", "tempat itu", "there", "that city",
+    # Perbandingan dengan kota yang disebut sebelumnya ("Bandingkan dengan Surabaya")
+    "bandingkan dengan", "dibandingkan dengan", "dibanding dengan", "compared to", "compare with",
+]
+
+# Sapaan dan basa-basi yang jelas bukan pertanyaan cuaca
+# Konfirmasi ("ya", "oke", "baik") sengaja tidak ada: bisa jadi jawaban atas tawaran model
+# ("Mau lihat prakiraan Bandung juga?"), jadi harus diputuskan router dengan konteks
+SMALL_TALK = [
+    "hi", "hai", "halo", "hallo", "hello", "hey", "pagi", "siang", "sore", "malam", "selamat",
+    "terima kasih", "terimakasih", "makasih", "thanks", "thank you", "mantap",
+    "apa kabar", "kabar", "bye", "dadah", "sampai jumpa",
+]
+
+# Sapaan yang boleh menyertai small talk ("halo kak") tapi tidak cukup sendirian ("min?")
+ADDRESS_TERMS = ["kak", "min", "bro"]
+
+CITIES = [
+    # Indonesia
+    "jakarta", "surabaya", "bandung", "medan", "semarang", "makassar", "palembang", "tangerang",
+    "tangerang selatan", "depok", "bekasi", "bogor", "yogyakarta", "surakarta", "malang", "denpasar",
+    "padang", "pekanbaru", "banjarmasin", "balikpapan", "samarinda", "pontianak", "manado",
+    "bandar lampung", "jambi", "bengkulu", "banda aceh", "kupang", "mataram", "ambon", "jayapura",
+    "sorong", "kendari", "palu", "gorontalo", "ternate", "cirebon", "tasikmalaya", "serang",
+    "cilegon", "sukabumi", "purwokerto", "tegal", "pekalongan", "magelang", "salatiga", "kudus",
+    "madiun", "kediri", "blitar", "jember", "banyuwangi", "probolinggo", "pasuruan", "mojokerto",
+    "sidoarjo", "gresik", "batam", "tanjung pinang", "pangkal pinang", "palangkaraya", "tarakan",
+    "pematangsiantar", "binjai", "bukittinggi", "dumai", "lhokseumawe", "parepare", "bitung",
+    # Mancanegara
+    "singapore", "kuala lumpur", "bangkok", "manila", "hanoi", "tokyo", "osaka", "seoul", "beijing",
+    "shanghai", "hong kong", "taipei", "sydney", "melbourne", "perth", "new delhi", "mumbai",
+    "dubai", "riyadh", "mecca", "madinah", "istanbul", "cairo", "london", "paris", "berlin",
+    "amsterdam", "rome", "madrid", "moscow", "new york", "los angeles", "san francisco", "chicago",
+    "toronto", "vancouver",
+]
+
+# Alias umum -> nama resmi (sama dengan aturan "jogja" -> "yogyakarta" di CITY_EXTRACTION_PROMPT)
+CITY_ALIASES = {
+    "jogja": "yogyakarta",
+    "jogjakarta": "yogyakarta",
+    "yogya": "yogyakarta",
+    "jogya": "yogyakarta",
+    "diy": "yogyakarta",
+    "jkt": "jakarta",
+    "dki": "jakarta",
+    "dki jakarta": "jakarta",
+    "sby": "surabaya",
+    "bdg": "bandung",
+    "smg": "semarang",
+    "solo": "surakarta",
+    "mks": "makassar",
+    "ujung pandang": "makassar",
+    "plg": "palembang",
+    "tangsel": "tangerang selatan",
+    "lampung": "bandar lampung",
+    "aceh": "banda aceh",
+    "palangka raya": "palangkaraya",
+    "singapura": "singapore",
+    "mekah": "mecca",
+    "makkah": "mecca",
+    "nyc": "new york",
+}
+
+# Nama hari -> weekday() Python
+WEEKDAYS = {
+    "senin": 0, "selasa": 1, "rabu": 2, "kamis": 3, "jumat": 4, "sabtu": 5, "minggu": 6,
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+
+# Jumlah hari data prakiraan OpenWeatherMap (5 hari / 3 jam)
+FORECAST_DAYS = 5
+
+# Skor keyakinan tiap aturan; keputusan lokal hanya dipakai jika >= ambang di QueryClassifier
+CONFIDENCE_WEATHER_WITH_CITY = 0.95
+CONFIDENCE_SMALL_TALK = 0.9
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+_DAYS_AHEAD = re.compile(r"(\d+)\s*hari\s*(?:ke\s*depan|kedepan|lagi|mendatang)")
+
+
+def resolve_target_dates(prompt: str, today: date, extra: Optional[date] = None) -> List[date]:
+    """Resolve the dates a query asks about ("hari ini", "besok", "3 hari ke depan", day names)"""
+    text = " ".join(tokenize(prompt))
+    dates = set()
+    if extra:
+        dates.add(extra)
+
+    match = _DAYS_AHEAD.search(text)
+    if match:
+        days = min(int(match.group(1)), FORECAST_DAYS)
+        dates.update(today + timedelta(days=i) for i in range(days + 1))
+    if re.search(r"\b(minggu ini|minggu depan|seminggu|sepekan|5 hari)\b", text):
+        dates.update(today + timedelta(days=i) for i in range(FORECAST_DAYS + 1))
+    if re.search(r"\b(hari ini|sekarang|nanti|malam ini|siang ini|sore ini|today|tonight)\b", text):
+        dates.add(today)
+    if re.search(r"\b(besok|esok|tomorrow)\b", text):
+        dates.add(today + timedelta(days=1))
+    if re.search(r"\blusa\b", text):
+        dates.add(today + timedelta(days=2))
+    if re.search(r"\b(akhir pekan|weekend)\b", text):
+        saturday = today + timedelta(days=(5 - today.weekday()) % 7)
+        dates.update((saturday, saturday + timedelta(days=1)))
+
+    # "minggu" tanpa "ini/depan" berarti hari Minggu
+    for name in re.findall(r"\b(" + "|".join(WEEKDAYS) + r")\b(?! ini| depan)", text):
+        dates.add(today + timedelta(days=(WEEKDAYS[name] - today.weekday()) % 7))
+    return sorted(dates)
+
+
+class PhraseTrie:
+    """Token-level trie for longest-match lookup of (multi-word) phrases"""
+
+    _END = "$"
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]] = ()):
+        self.root: Dict = {}
+        for phrase, value in phrases:
+            self.add(phrase, value)
+
+    def add(self, phrase: str, value: str):
+        node = self.root
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node[self._END] = value
+
+    def find_all(self, tokens: List[str]) -> List[Tuple[int, int, str]]:
+        """Return non-overlapping (start, end, value) matches, preferring the longest phrase"""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if self._END in node:
+                    best = (i, j, node[self._END])
+            if best:
+                matches.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return matches
+
+
+def _build_city_trie() -> PhraseTrie:
+    trie = PhraseTrie((city, city) for city in CITIES)
+    for alias, city in CITY_ALIASES.items():
+        trie.add(alias, city)
+    return trie
+
+
+class QueryClassifier:
+    """Rule-based pre-classifier that answers obvious queries without calling the LLM router"""
+
+    def __init__(self, min_confidence: float = 0.9):
+        self.min_confidence = min_confidence
+        self.city_trie = _build_city_trie()
+        self.keyword_trie = PhraseTrie((kw, kw) for kw in WEATHER_KEYWORDS)
+        self.anaphora_trie = PhraseTrie((phrase, phrase) for phrase in ANAPHORA)
+        self.small_talk_trie = PhraseTrie((phrase, phrase) for phrase in SMALL_TALK)
+        self.address_trie = PhraseTrie((phrase, phrase) for phrase in ADDRESS_TERMS)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "hits": 0, "weather_hits": 0, "small_talk_hits": 0}
+        self._misses = {}
+        self._elapsed_ns = 0
+
+    def find_cities(self, text: str) -> List[str]:
+        """Return distinct gazetteer cities mentioned in text, in order of appearance"""
+        return self._cities(tokenize(text))
+
+    def _cities(self, tokens: List[str]) -> List[str]:
+        return list(dict.fromkeys(city for _, _, city in self.city_trie.find_all(tokens)))
+
+    def is_context_dependent(self, text: str) -> bool:
+        """True if resolving text needs the conversation: anaphora ("disana", "di kota itu"),
+        or a weather question without a known city ("besok hujan?")"""
+        tokens = tokenize(text)
+        if self.anaphora_trie.find_all(tokens):
+            return True
+        return bool(self.keyword_trie.find_all(tokens)) and not self.city_trie.find_all(tokens)
+
+    def guess(self, prompt: str, last_cities: Iterable[str] = ()) -> Dict:
+        """Best-effort route from the rules alone, for when the LLM router cannot be reached"""
+        tokens = tokenize(prompt)
+        cities = [city.replace(" ", "%20") for city in self._cities(tokens)]
+        is_weather = bool(self.keyword_trie.find_all(tokens))
+        if not cities and last_cities and self.is_context_dependent(prompt):
+            cities = list(last_cities)
+            is_weather = True
+        return {"is_weather": is_weather, "cities": cities, "target_date": None}
+
+    def classify(self, prompt: str) -> Optional[Dict]:
+        """Return a route decision for high-confidence prompts, or None to defer to the LLM"""
+        start = time.perf_counter_ns()
+        decision, reason = self._classify(prompt)
+        if decision is not None and decision["confidence"] < self.min_confidence:
+            decision, reason = None, "low_confidence"
+        self._record(decision, reason, time.perf_counter_ns() - start)
+        return decision
+
+    def _classify(self, prompt: str):
+        tokens = tokenize(prompt)
+        if not tokens:
+            return None, "empty"
+        if self.anaphora_trie.find_all(tokens):
+            return None, "anaphora"
+
+        cities = self._cities(tokens)
+        has_keyword = bool(self.keyword_trie.find_all(tokens))
+
+        if has_keyword:
+            if cities:
+                # Beberapa kota sekaligus ("bandingkan cuaca Jakarta dan Bandung") juga dijawab lokal
+                return {
+                    "is_weather": True,
+                    "cities": [city.replace(" ", "%20") for city in cities],
+                    "target_date": None,
+                    "confidence": CONFIDENCE_WEATHER_WITH_CITY,
+                }, "weather"
+            return None, "no_city"
+
+        if cities:
+            return None, "city_without_keyword"
+
+        small_talk = self.small_talk_trie.find_all(tokens)
+        covered = sum(end - start for start, end, _ in small_talk + self.address_trie.find_all(tokens))
+        if small_talk and covered == len(tokens):
+            return {
+                "is_weather": False,
+                "cities": [],
+                "target_date": None,
+                "confidence": CONFIDENCE_SMALL_TALK,
+            }, "small_talk"
+        return None, "unknown"
+
+    def _record(self, decision, reason, elapsed_ns):
+        with self._lock:
+            self._counters["calls"] += 1
+            self._elapsed_ns += elapsed_ns
+            if decision is None:
+                self._misses[reason] = self._misses.get(reason, 0) + 1
+            else:
+                self._counters["hits"] += 1
+                self._counters[f"{reason}_hits"] += 1
+
+    def stats(self) -> Dict:
+        """Hit rate, miss reasons and average classification latency"""
+        with self._lock:
+            calls = self._counters["calls"]
+            return {
+                **self._counters,
+                "misses": dict(self._misses),
+                "hit_rate": self._counters["hits"] / calls if calls else 0.0,
+                "avg_latency_us": self._elapsed_ns / calls / 1000 if calls else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters = {key: 0 for key in self._counters}
+            self._misses = {}
+            self._elapsed_ns = 0
+
+
+# Dipakai bersama oleh semua sesi dalam satu proses
+query_classifier = QueryClassifier(LEXICON_MIN_CONFIDENCE)
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU map with optional per-entry expiry, a total-weight bound and hit/miss counters
+
+    Shared building block of the route, forecast and answer caches. lock is re-entrant so an
+    owner can make several calls atomic (e.g. a lookup plus its own bookkeeping).
+    """
+
+    def __init__(self, max_entries: int, max_weight: float = 0, weigh: Optional[Callable[[Any], float]] = None,
+                 counters: Iterable[str] = ()):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self.lock = threading.RLock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at atau None)
+        self._stats = dict.fromkeys(("hits", "misses", "stores", "evictions", "expirations", *counters), 0)
+
+    def get(self, key: Hashable, record: bool = True) -> Optional[Any]:
+        """Fresh value for key or None; record=False looks up without touching the hit/miss counters"""
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                if record:
+                    self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            if record:
+                self._stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        with self.lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.weight += self._weigh(value)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries or (self.max_weight and self.weight > self.max_weight):
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def pop(self, key: Hashable) -> bool:
+        """Forget key; returns True if it was cached"""
+        with self.lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        with self.lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else None
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self._stats[name] += amount
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: Hashable):
+        value, _ = self._entries.pop(key)
+        self.weight -= self._weigh(value)
+
+    def _weigh(self, value: Any) -> float:
+        return self.weigh(value) if self.weigh else 0
@@ -1,165 +1,126 @@
 import streamlit as st
-import asyncio
-from models import ModelManager
-from weather_service import WeatherService
+from models import model_manager
+from runtime import SessionLoop
+from providers import provider_registry
+from pipeline import ChatPipeline
+from sessions import SessionStore
 from ui import UI
-from config import MODELS, REQUIRED_API_KEYS, WEATHER_ANALYSIS_PROMPT, CITY_EXTRACTION_PROMPT, WEATHER_RESPONSE_PROMPT, GENERAL_CONVERSATION_PROMPT
+from config import REQUIRED_API_KEYS, has_secret
+
+class StreamlitSessionStore(SessionStore):
+    """Keeps the conversations of one browser session in st.session_state"""
+
+    def get(self, session_id):
+        return st.session_state.setdefault("chat_sessions", {}).get(session_id)
+
+    def save(self, session):
+        st.session_state.setdefault("chat_sessions", {})[session.id] = session
+
+    def delete(self, session_id):
+        st.session_state.setdefault("chat_sessions", {}).pop(session_id, None)
 
 class AppHelper:
     @staticmethod
     def check_required_keys():
         """Verify all required API keys are present"""
-        for key in REQUIRED_API_KEYS:
-            if key not in st.secrets:
+        for key in REQUIRED_API_KEYS + provider_registry.required_secrets():
+            if not has_secret(key):
                 st.error(f'Missing {key} in secrets.toml')
                 st.stop()
 
     @staticmethod
-    def initialize_session_state():
-        """Initialize session state variables"""
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
-        if 'message_history' not in st.session_state:
-            st.session_state.message_history = []
-
-    @staticmethod
-    def format_chat_context():
-        """Format message history for model context"""
-        formatted_history = ""
-        for msg in st.session_state.message_history[-5:]:  # Ambil 5 pesan terakhir saja
-            role = "Assistant" if msg["role"] == "assistant" else "Human"
-            formatted_history += f"{role}: {msg['content']}\n"
-        return formatted_history.strip()
-
-    @staticmethod
-    async def is_weather_query(model_manager, prompt):
-        """Determine if prompt is asking about weather"""
-        context = AppHelper.format_chat_context()
-        formatted_prompt = WEATHER_ANALYSIS_PROMPT.format(
-            context=context,
-            prompt=prompt
-        )
+    def initialize_clients():
+        """Build (or reuse) the API clients, stopping the app on a broken configuration"""
         try:
-            response = await model_manager.get_single_response("gemini", formatted_prompt)
-            return response.strip().lower() == "yes"
+            model_manager.initialize_clients()
         except Exception as e:
-            st.error("Error analyzing query type. Treating as general conversation.")
-            return False
-
-    @staticmethod
-    async def extract_city_from_prompt(model_manager, prompt):
-        """Extract city name from weather query with chat history context"""
-        context = AppHelper.format_chat_context()
-        formatted_prompt = CITY_EXTRACTION_PROMPT.format(
-            context=context,
-            prompt=prompt
-        )
-        try:
-            response = await model_manager.get_single_response("gemini", formatted_prompt)
-            return response.strip().lower()
-        except Exception as e:
-            st.error("Error extracting city. Please try again with a valid city name.")
-            return None
+            st.error(f"Error initializing API clients: {str(e)}")
+            st.stop()
+
+class TurnView:
+    """Renders pipeline events into the Streamlit page"""
+
+    def __init__(self, user_input):
+        self.user_input = user_input
+        self.renderers = {}
+        self._spinner = None
+        self._user_shown = False
+
+    def _stop_spinner(self):
+        if self._spinner is not None:
+            self._spinner.__exit__(None, None, None)
+            self._spinner = None
+
+    def _show_user_message(self):
+        if not self._user_shown:
+            st.chat_message("user").write(self.user_input)
+            self._user_shown = True
+
+    def handle(self, event):
+        kind = event["type"]
+        self._stop_spinner()
+        if kind == "status":
+            self._spinner = st.spinner(event["message"])
+            self._spinner.__enter__()
+        elif kind == "error":
+            st.error(event["message"])
+        elif kind == "notice":
+            st.warning(event["message"])
+        elif kind == "forecast":
+            self._show_user_message()
+            UI.display_weather_data(event["text"], event["location"])
+        elif kind == "start":
+            self._show_user_message()
+            # Create throttled renderers for streaming responses
+            self.renderers = UI.create_response_containers()
+        elif kind == "chunk":
+            self.renderers[event["model"]].append(event["text"])
+        elif kind == "done":
+            self.renderers[event["model"]].flush()
+
+    def close(self):
+        self._stop_spinner()
 
 async def main():
-    # Initialize helper and session state
     helper = AppHelper()
     helper.check_required_keys()
-    helper.initialize_session_state()
-
-    # Initialize services
-    model_manager = ModelManager()
-    weather_service = WeatherService()
+    # SDK provider diimpor di background selagi halaman pertama dirender
+    provider_registry.preload()
+    session = StreamlitSessionStore().get_or_create("default")
+    pipeline = ChatPipeline(model_manager)
 
     # Setup UI
     UI.setup()
     UI.display_sidebar()
 
     # Display chat history
-    UI.display_chat_history(st.session_state.chat_history)
+    UI.display_chat_history(session.chat_history, session.forecasts)
+
+    # Initialize services setelah render pertama (klien API di-cache per proses, jadi murah di setiap rerun)
+    helper.initialize_clients()
 
     # Handle new user input
     user_input = st.chat_input("Tanyakan tentang cuaca...")
 
     if user_input:
-        st.session_state.message_history.append({
-            "role": "user",
-            "content": user_input
-        })
-
-        context = AppHelper.format_chat_context()
-
-        with st.spinner("Memahami pertanyaan Anda..."):
-            is_weather = await helper.is_weather_query(model_manager, user_input)
-
-        weather_data = None
-        if is_weather and st.session_state.use_weather_api:  # Tambahkan pengecekan use_weather_api
-            city = await helper.extract_city_from_prompt(model_manager, user_input)
-            if city and city != "lokasi%20tidak%20diketahui":
-                with st.spinner(f"Mengambil data cuaca untuk {city}..."):
-                    weather_data = weather_service.get_weather_data(city)
-                    if not weather_data:
-                        st.error(f"Tidak dapat mengambil data cuaca untuk {city}. Mohon periksa nama kota dan coba lagi.")
-                        st.stop()
-
-        # Display user message
-        st.chat_message("user").write(user_input)
-
-        if weather_data:
-            UI.display_weather_data(weather_service.format_weather_data(weather_data, user_input))
-
-        # Prepare full prompt with context and API status
-        context = AppHelper.format_chat_context()
-        api_status_info = "" if st.session_state.use_weather_api else "\n[API OpenWeatherMap tidak digunakan. Berikan respons umum berdasarkan pengetahuan yang dimiliki.]"
-
-        prompt_template = WEATHER_RESPONSE_PROMPT if weather_data else GENERAL_CONVERSATION_PROMPT
-        full_prompt = prompt_template.format(
-            context=context,
-            prompt=user_input + api_status_info,
-            weather_info=weather_service.format_weather_data(weather_data, user_input) if weather_data else ""
-        )
-
-        # Create containers for streaming responses
-        response_containers, tab_containers = UI.create_response_containers()
-        responses = {model: "" for model in MODELS.keys()}
-
-        # Get streaming responses
-        streams = await model_manager.get_streaming_responses(
-            list(MODELS.keys()),
-            full_prompt,
-            weather_data
-        )
-
-        # Process streams
-        async def process_stream(model_type: str, stream) -> None:
-            async for chunk in stream:
-                if chunk:
-                    responses[model_type] += chunk
-                    await asyncio.sleep(0)
-                    response_containers[model_type].markdown(responses[model_type])
-                    tab_containers[model_type].markdown(responses[model_type])
-
-        # Run all tasks concurrently
-        tasks = [
-            asyncio.create_task(process_stream(model_type, stream))
-            for model_type, stream in streams.items()
-        ]
-        await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Add assistant response to message history
-        st.session_state.message_history.append({
-            "role": "assistant",
-            "content": responses["mistral"]
-        })
-
-        # Store in chat history
-        chat_entry = {
-            "user_input": user_input,
-            "responses": responses.copy()
-        }
-        if weather_data:
-            chat_entry["weather_data"] = weather_service.format_weather_data(weather_data, user_input)
-        st.session_state.chat_history.append(chat_entry)
+        view = TurnView(user_input)
+        events = pipeline.run_turn(session, user_input, st.session_state.use_weather_api)
+        try:
+            async for event in events:
+                view.handle(event)
+        finally:
+            await events.aclose()
+            view.close()
+
+def run_in_session_loop(coro):
+    """Run coro on an event loop kept per browser session so pooled connections survive reruns
+
+    The loop and its pooled clients are closed when Streamlit drops the session state.
+    """
+    session_loop = st.session_state.get("session_loop")
+    if session_loop is None:
+        session_loop = st.session_state.session_loop = SessionLoop()
+    return session_loop.run(coro)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_in_session_loop(main())
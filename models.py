@@ -1,99 +1,189 @@
-import streamlit as st
-import groq
-from groq import AsyncGroq
-import google.generativeai as genai
-from mistralai import Mistral
 import asyncio
-from config import MODELS
-from typing import AsyncGenerator, Dict
+import time
+from providers import provider_registry
+from resources import resource_pool
+from response_cache import response_cache
+from fanout import FanoutPolicy, FanoutResult, NOTICES, fanout_policy
+from resilience import PRIORITY_ROUTER, PRIORITY_STREAM, UpstreamUnavailable, error_status, upstreams
+from telemetry import tracer
+from typing import AsyncGenerator, Callable, Dict
+
 
 class ModelManager:
-    def __init__(self):
-        self.initialize_clients()
-        
+    """Provider access over process-wide cached clients; cheap to construct on every rerun"""
+
     def initialize_clients(self):
-        """Initialize all API clients"""
-        try:
-            self.mistral_client = Mistral(api_key=st.secrets["MISTRAL_API_KEY"])
-            self.async_groq_client = AsyncGroq(api_key=st.secrets["GROQ_API_KEY"])
-            genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        except Exception as e:
-            st.error(f"Error initializing API clients: {str(e)}")
-            st.stop()
+        """Build (or reuse) the active providers' clients so a broken configuration fails before the first turn"""
+        for model_type in provider_registry.active:
+            provider_registry.get(model_type).warm()
+
+    @staticmethod
+    def _handle_error(provider, error):
+        """Drop the cached client after connection failures so the next call gets a fresh one"""
+        if isinstance(error, provider.connection_errors()):
+            resource_pool.invalidate(provider.resource)
 
     async def get_single_response(self, model_type: str, prompt: str) -> str:
-        """Get a single non-streaming response for analysis purposes"""
-        try:
-            if model_type == "mistral":
-                completion = self.mistral_client.chat.completions.create(
-                    model=MODELS["mistral"]["name"],
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return completion.choices[0].message.content
-            elif model_type == "gemini":
-                model = genai.GenerativeModel(MODELS["gemini"]["name"])
-                response = model.generate_content(prompt)
-                return response.text
-            elif model_type == "llama":
-                completion = await self.async_groq_client.chat.completions.create(
-                    model=MODELS["llama"]["name"],
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=MODELS["llama"]["temperature"],
-                    max_tokens=MODELS["llama"]["max_tokens"]
-                )
-                return completion.choices[0].message.content
-        except Exception as e:
-            return f"Error: {str(e)}"
+        """Get a single non-streaming response for analysis purposes
+
+        Provider errors come back as "Error: ..." text; UpstreamUnavailable (rate limit or open
+        breaker) is raised so callers can skip further calls to the same upstream.
+        """
+        with tracer.span(f"provider.{model_type}.single", model=model_type) as span:
+            provider = provider_registry.get(model_type)
+            try:
+                # Panggilan router didahulukan dari stream jawaban di antrean rate limit
+                async with upstreams.get(provider.upstream).call(PRIORITY_ROUTER):
+                    return await provider.complete(prompt)
+            except UpstreamUnavailable as e:
+                # Ditolak lokal; pemanggil yang memutuskan (mis. router tidak mencoba jalur fallback)
+                span.set(rejected=e.reason)
+                raise
+            except Exception as e:
+                self._handle_error(provider, e)
+                tracer.record_error(model_type)
+                span.set(error=f"{type(e).__name__}: {e}")
+                return f"Error: {str(e)}"
     
-    async def get_streaming_responses(self, model_types: list, prompt: str, weather_data: Dict = None) -> Dict[str, AsyncGenerator]:
-        """Get streaming responses from specified models concurrently"""
+    async def get_streaming_responses(self, model_types: list, prompt: str, weather_data: Dict = None,
+                                      cache_key: str = None, cache_expires_at: float = None,
+                                      on_outcome: Callable = None) -> Dict[str, AsyncGenerator]:
+        """Get streaming responses from specified models concurrently
+
+        With cache_key (see response_cache.make_prompt_key) a cached answer is replayed through the
+        same async-generator interface, and clean completions are stored until cache_expires_at.
+        on_outcome(model_type, error, seconds) is called when a live provider stream ends (error is None
+        on success); cache replays do not report.
+        """
         streams = {}
         for model_type in model_types:
-            if model_type == "mistral":
-                streams[model_type] = self._get_mistral_stream(prompt, weather_data)
-            elif model_type == "gemini":
-                streams[model_type] = self._get_gemini_stream(prompt, weather_data)
-            elif model_type == "llama":
-                streams[model_type] = self._get_llama_stream(prompt, weather_data)
-        return streams
+            if model_type not in provider_registry.enabled:
+                continue
+            use_cache = cache_key is not None and response_cache.is_active(model_type)
+            cached = response_cache.get(model_type, cache_key) if use_cache else None
+            if cached is not None:
+                streams[model_type] = self._replay(cached)
+                continue
 
-    async def _get_mistral_stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
-        try:
-            stream = self.mistral_client.chat.stream(
-                model=MODELS["mistral"]["name"],
-                messages=[{"role": "user", "content": prompt}]
+            on_complete = None
+            if use_cache:
+                def on_complete(text, model_type=model_type):
+                    response_cache.set(model_type, cache_key, text, cache_expires_at)
+            streams[model_type] = self._guarded_stream(
+                model_type, provider_registry.get(model_type).stream(prompt, weather_data), on_complete, on_outcome
             )
-            for chunk in stream:
-                if hasattr(chunk, 'data'):
-                    content = chunk.data.choices[0].delta.content
-                    if content:
-                        yield content
-                elif hasattr(chunk, 'choices') and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-        except Exception as e:
-            yield f"Error from Mistral: {str(e)}"
+        return streams
 
-    async def _get_gemini_stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+    async def _guarded_stream(self, model_type: str, stream: AsyncGenerator[str, None],
+                              on_complete=None, on_outcome=None) -> AsyncGenerator[str, None]:
+        """Turn provider exceptions into inline error text; report the full answer only on clean completion"""
+        parts = []
+        start = time.monotonic()
+        provider = provider_registry.get(model_type)
         try:
-            model = genai.GenerativeModel(MODELS["gemini"]["name"])
-            response = model.generate_content(prompt, stream=True)
-            for chunk in response:
-                if chunk.text:
-                    yield chunk.text
+            async with upstreams.get(provider.upstream).call(PRIORITY_STREAM):
+                async for chunk in tracer.instrument_stream(model_type, stream):
+                    parts.append(chunk)
+                    yield chunk
         except Exception as e:
-            yield f"Error from Gemini: {str(e)}"
+            self._handle_error(provider, e)
+            if on_outcome:
+                on_outcome(model_type, e, time.monotonic() - start)
+            if isinstance(e, UpstreamUnavailable) or error_status(e) == 429:
+                yield NOTICES["unavailable"].format(label=provider.label or model_type)
+            else:
+                yield f"Error from {provider.label or model_type}: {str(e)}"
+            return
+        if on_outcome:
+            on_outcome(model_type, None, time.monotonic() - start)
+        if on_complete:
+            on_complete("".join(parts))
+
+    async def fan_out(self, model_types: list, prompt: str, weather_data: Dict = None,
+                      policy: FanoutPolicy = None, on_chunk: Callable = None, on_done: Callable = None,
+                      cache_key: str = None, cache_expires_at: float = None) -> FanoutResult:
+        """Stream from the models the policy selects, bounding each by its deadline
 
-    async def _get_llama_stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+        on_chunk(model_type, text) receives every chunk (including timeout/cancel notices) and
+        on_done(model_type, status) fires once per model as it settles (models the policy skipped
+        settle immediately with status "skipped"). In "first_good" mode the
+        remaining streams are cancelled once one model finishes cleanly.
+        """
+        policy = policy or fanout_policy
+        selected = policy.select(model_types)
+        result = FanoutResult([model_type for model_type in model_types if model_type not in selected])
+        failed = set()
+
+        def on_outcome(model_type, error, seconds):
+            # Penolakan lokal (breaker terbuka/antrean penuh) tidak mengukur latensi provider
+            if not isinstance(error, UpstreamUnavailable):
+                policy.health.observe(model_type, seconds, ok=error is None)
+            if error is not None:
+                failed.add(model_type)
+
+        streams = await self.get_streaming_responses(
+            selected, prompt, weather_data,
+            cache_key=cache_key,
+            cache_expires_at=cache_expires_at,
+            on_outcome=on_outcome
+        )
+
+        def emit(model_type, parts, text):
+            parts.append(text)
+            if on_chunk:
+                on_chunk(model_type, text)
+
+        for model_type in result.skipped:
+            emit(model_type, [], NOTICES["skipped"])
+            if on_done:
+                on_done(model_type, "skipped")
+
+        async def consume(model_type, stream):
+            parts = []
+            start = time.monotonic()
+            deadline = policy.deadline(model_type)
+
+            async def drain():
+                async for chunk in stream:
+                    if chunk:
+                        emit(model_type, parts, chunk)
+
+            status = "cancelled"
+            try:
+                await asyncio.wait_for(drain(), deadline)
+                status = "error" if model_type in failed else "ok"
+            except asyncio.TimeoutError:
+                status = "timeout"
+                policy.health.observe(model_type, deadline, ok=False)
+                emit(model_type, parts, NOTICES["timeout"].format(deadline=deadline))
+            except asyncio.CancelledError:
+                emit(model_type, parts, NOTICES["cancelled"])
+                raise
+            finally:
+                result.record(model_type, status, "".join(parts), time.monotonic() - start)
+                if on_done:
+                    on_done(model_type, status)
+            return status
+
+        pending = {asyncio.create_task(consume(model_type, stream)) for model_type, stream in streams.items()}
         try:
-            stream = await self.async_groq_client.chat.completions.create(
-                model=MODELS["llama"]["name"],
-                messages=[{"role": "user", "content": prompt}],
-                temperature=MODELS["llama"]["temperature"],
-                max_tokens=MODELS["llama"]["max_tokens"],
-                stream=True
-            )
-            async for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-        except Exception as e:
-            yield f"Error from Llama: {str(e)}"
\ No newline at end of file
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if policy.mode == "first_good" and any(
+                    not task.cancelled() and task.exception() is None and task.result() == "ok" for task in done
+                ):
+                    break
+        finally:
+            # Straggler dibatalkan, baik karena sudah ada jawaban bagus maupun karena giliran dibatalkan
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return result
+
+    @staticmethod
+    async def _replay(text: str) -> AsyncGenerator[str, None]:
+        yield text
+
+
+model_manager = ModelManager()
@@ -0,0 +1,298 @@
+import asyncio
+from datetime import date, timedelta
+from typing import AsyncGenerator, Dict, List
+from urllib.parse import unquote
+from config import MODELS, ROUTER_MODEL, SPECULATIVE_PREFETCH, WEATHER_MAX_CITIES, CONTEXT_ROUTER_TOKENS, WEATHER_ANALYSIS_PROMPT, CITY_EXTRACTION_PROMPT, QUERY_ROUTER_PROMPT, WEATHER_RESPONSE_PROMPT, GENERAL_CONVERSATION_PROMPT
+from fanout import NOTICES, provider_health
+from forecast import comparison_table
+from forecast_cache import forecast_cache, city_cache_key
+from lexicon import query_classifier, resolve_target_dates
+from resilience import UpstreamUnavailable, upstreams
+from resources import resource_pool
+from response_cache import make_prompt_key, response_cache
+from router import depends_on_context, normalize_cities, parse_route_response, route_cache
+from sessions import Session
+from telemetry import tracer
+from weather_service import MalformedWeatherData, WeatherService, ForecastPrefetch
+
+# Statistik komponen bersama ikut diekspor ke endpoint Prometheus
+tracer.register_collector("lexicon", query_classifier.stats)
+tracer.register_collector("route_cache", route_cache.stats)
+tracer.register_collector("forecast_cache", forecast_cache.stats)
+tracer.register_collector("response_cache", response_cache.stats)
+tracer.register_collector("prefetch", ForecastPrefetch.stats)
+tracer.register_collector("resource_pool", resource_pool.stats)
+tracer.register_collector("provider_health", provider_health.stats)
+tracer.register_collector("upstreams", upstreams.stats)
+
+API_DISABLED_NOTE = "\n[API OpenWeatherMap tidak digunakan. Berikan respons umum berdasarkan pengetahuan yang dimiliki.]"
+
+
+class ChatPipeline:
+    """One chat turn (route, fetch weather, fan out to the models, store) independent of any UI framework
+
+    run_turn() yields plain event dicts; the Streamlit client and the HTTP server render the same events:
+      status    {"stage", "message"}          a slow stage started
+      route     {"route"}                     routing decision (is_weather, cities, target_date, source)
+      notice    {"message"}                   something the user should know, the turn continues
+      error     {"message"}                   the turn was aborted (e.g. no forecast for any city)
+      forecast  {"city", "location", "text"}  forecast shown to the user, one event per city
+      start     {"models"}                    answer streams are starting
+      chunk     {"model", "text"}             streamed answer text
+      done      {"model", "status"}           one model settled (ok, error, timeout, cancelled, skipped)
+      turn      {"id", "canonical", ...}      the turn was stored in the session
+    """
+
+    def __init__(self, model_manager, weather_service=WeatherService, model_types=None):
+        self.model_manager = model_manager
+        self.weather_service = weather_service
+        self.model_types = list(model_types or MODELS.keys())
+
+    async def is_weather_query(self, session: Session, prompt: str) -> bool:
+        """Determine if prompt is asking about weather"""
+        formatted_prompt = WEATHER_ANALYSIS_PROMPT.format(
+            context=session.format_chat_context(CONTEXT_ROUTER_TOKENS),
+            prompt=prompt
+        )
+        try:
+            response = await self.model_manager.get_single_response(ROUTER_MODEL, formatted_prompt)
+            return response.strip().lower() == "yes"
+        except Exception:
+            # Dianggap percakapan umum
+            return False
+
+    async def extract_cities_from_prompt(self, session: Session, prompt: str) -> List[str]:
+        """Extract the (normalized) city names of a weather query with chat history context"""
+        formatted_prompt = CITY_EXTRACTION_PROMPT.format(
+            context=session.format_chat_context(CONTEXT_ROUTER_TOKENS),
+            prompt=prompt
+        )
+        try:
+            response = await self.model_manager.get_single_response(ROUTER_MODEL, formatted_prompt)
+            return normalize_cities(response.split(","))
+        except Exception:
+            return []
+
+    async def route_query(self, session: Session, prompt: str, use_weather_api: bool = True) -> Dict:
+        """Classify intent, city and target date with one router call, falling back to the two-step path"""
+        # Kasus yang jelas (mis. "Cuaca Surabaya besok", "Hi") dijawab lokal tanpa LLM
+        route = query_classifier.classify(prompt)
+        if route is not None:
+            route["source"] = "lexicon"
+            return route
+
+        context = session.format_chat_context(CONTEXT_ROUTER_TOKENS)
+        route = route_cache.get(prompt, context)
+        if route is not None:
+            route["source"] = "cache"
+            return route
+
+        today = date.today()
+        formatted_prompt = QUERY_ROUTER_PROMPT.format(
+            context=context,
+            prompt=prompt,
+            today=today.isoformat(),
+            # Contoh di prompt memakai tanggal asli; placeholder yang disalin model gagal di-parse
+            tomorrow=(today + timedelta(days=1)).isoformat()
+        )
+        try:
+            response = await self.model_manager.get_single_response(ROUTER_MODEL, formatted_prompt)
+        except UpstreamUnavailable:
+            # Router sedang dibatasi: jalur fallback hanya menambah dua panggilan ke upstream yang sama
+            route = query_classifier.guess(prompt, session.last_cities)
+            route["source"] = "lexicon_fallback"
+            return route
+        except Exception:
+            response = None
+
+        route = parse_route_response(response)
+        if route is not None:
+            route_cache.set(prompt, context, route)
+            route["source"] = "router"
+            return route
+
+        # JSON tidak valid, pakai jalur lama: cek intent lalu ekstrak kota
+        is_weather = await self.is_weather_query(session, prompt)
+        cities = []
+        if is_weather and use_weather_api:
+            cities = await self.extract_cities_from_prompt(session, prompt)
+        return {
+            "is_weather": is_weather,
+            "cities": cities,
+            "target_date": None,
+            "source": "fallback"
+        }
+
+    async def _fetch_forecast(self, city: str, prefetches: Dict[str, ForecastPrefetch]):
+        """Forecast JSON of one city, taken from its speculative prefetch when there is one"""
+        prefetch = prefetches.pop(city_cache_key(city), None)
+        if prefetch is not None:
+            # Prefetch untuk kota yang sama: hasil None (mis. 404) dipakai apa adanya, tanpa fetch ulang
+            return await prefetch.resolve(city)
+        return await self.weather_service.get_weather_data_async(city)
+
+    @staticmethod
+    def _weather_info(cities: List[str], forecasts: Dict, target_dates, malformed=()) -> str:
+        """Forecast section of the answer prompt: full detail for one city, a comparison table for several;
+        cities without a forecast are listed as invalid (unreadable data) or unavailable (fetch failed,
+        over WEATHER_MAX_CITIES)"""
+        if not forecasts:
+            return ""
+        if len(forecasts) == 1:
+            info = next(iter(forecasts.values())).to_prompt(target_dates)
+        else:
+            info = comparison_table(forecasts.values(), target_dates)
+        if malformed:
+            info += f"\nData cuaca tidak valid untuk: {', '.join(unquote(city) for city in malformed)}"
+        missing = [unquote(city) for city in cities if city not in forecasts and city not in malformed]
+        if missing:
+            info += f"\nData cuaca tidak tersedia untuk: {', '.join(missing)}"
+        return info
+
+    async def run_turn(self, session: Session, user_input: str, use_weather_api: bool = True) -> AsyncGenerator[Dict, None]:
+        """Answer one user message, yielding events as the turn progresses"""
+        with tracer.trace("turn", use_weather_api=use_weather_api):
+            async for event in self._run_turn(session, user_input, use_weather_api):
+                yield event
+
+    async def _run_turn(self, session: Session, user_input: str, use_weather_api: bool) -> AsyncGenerator[Dict, None]:
+        session.context.add("user", user_input)
+
+        # Spekulatif: mulai ambil data cuaca kota yang paling mungkin selagi router masih bekerja
+        prefetches = {}
+        if SPECULATIVE_PREFETCH and use_weather_api:
+            for candidate_city in session.guess_cities(user_input)[:WEATHER_MAX_CITIES]:
+                prefetch = ForecastPrefetch(candidate_city)
+                prefetches[prefetch.key] = prefetch
+
+        try:
+            yield {"type": "status", "stage": "routing", "message": "Memahami pertanyaan Anda..."}
+            with tracer.span("routing") as span:
+                route = await self.route_query(session, user_input, use_weather_api)
+                span.set(source=route["source"], is_weather=route["is_weather"], cities=route["cities"])
+            yield {"type": "route", "route": route}
+
+            fetched = {}
+            cities = route["cities"][:WEATHER_MAX_CITIES]
+            if route["is_weather"] and use_weather_api and cities:
+                names = ", ".join(cities)
+                skipped = route["cities"][WEATHER_MAX_CITIES:]
+                if skipped:
+                    yield {
+                        "type": "notice",
+                        "message": f"Maksimal {WEATHER_MAX_CITIES} kota per pertanyaan; {', '.join(map(unquote, skipped))} dilewati."
+                    }
+                yield {"type": "status", "stage": "weather_fetch", "message": f"Mengambil data cuaca untuk {names}..."}
+                with tracer.span("weather_fetch", cities=cities) as span:
+                    span.set(prefetched=sum(city_cache_key(city) in prefetches for city in cities))
+                    # Semua kota diambil bersamaan; latensinya mendekati fetch kota yang paling lambat
+                    results = await asyncio.gather(*(self._fetch_forecast(city, prefetches) for city in cities))
+                    fetched = {city: weather_data for city, weather_data in zip(cities, results) if weather_data}
+                    if len(fetched) < len(cities):
+                        span.set(missing=[city for city in cities if city not in fetched])
+                if not fetched:
+                    yield {"type": "error", "message": f"Tidak dapat mengambil data cuaca untuk {names}. Mohon periksa nama kota dan coba lagi."}
+                    return
+                session.last_cities = list(fetched)
+        finally:
+            for prefetch in prefetches.values():
+                prefetch.discard()
+
+        # Parse sekali per giliran; teks UI, prompt dan riwayat memakai view yang di-memoize
+        forecasts = {}
+        malformed = {}
+        with tracer.span("forecast_parse", cities=len(fetched)) as span:
+            for city, weather_data in fetched.items():
+                try:
+                    forecast = self.weather_service.parse_forecast(weather_data)
+                except MalformedWeatherData as e:
+                    malformed[city] = str(e)
+                    continue
+                if forecast:
+                    forecasts[city] = forecast
+            if malformed:
+                span.set(malformed=malformed)
+        for city, forecast in forecasts.items():
+            yield {"type": "forecast", "city": city, "location": forecast.location, "text": forecast.to_text()}
+        if malformed:
+            names = ", ".join(unquote(city) for city in malformed)
+            if not forecasts:
+                # Jangan diam-diam menjawab dengan prompt umum seolah tidak ada data cuaca yang diminta
+                yield {"type": "error", "message": f"Data cuaca untuk {names} tidak dapat dibaca. Silakan coba lagi nanti."}
+                return
+            yield {"type": "notice", "message": f"Data cuaca untuk {names} tidak dapat dibaca dan dilewati."}
+
+        # Prepare full prompt with context and API status. Pertanyaan mandiri dijawab tanpa riwayat
+        # percakapan, supaya jawaban yang di-cache lintas sesi tidak memuat isi percakapan sesi lain
+        standalone = not depends_on_context(user_input, route)
+        context = "" if standalone else session.format_chat_context()
+        api_status_info = "" if use_weather_api else API_DISABLED_NOTE
+
+        with tracer.span("prompt_build") as span:
+            target_dates = resolve_target_dates(user_input, date.today(), route["target_date"])
+            prompt_template = WEATHER_RESPONSE_PROMPT if forecasts else GENERAL_CONVERSATION_PROMPT
+            full_prompt = prompt_template.format(
+                context=context,
+                prompt=user_input + api_status_info,
+                weather_info=self._weather_info(route["cities"], forecasts, target_dates, malformed)
+            )
+            span.set(prompt_chars=len(full_prompt), cities=len(forecasts))
+
+        # Jawaban identik dalam jendela prakiraan yang sama diputar ulang dari cache; key mencakup
+        # semua masukan full_prompt (riwayat hanya bila memang ikut di prompt)
+        cache_key = make_prompt_key(
+            template="weather" if forecasts else "general",
+            context=None if standalone else context,
+            prompt=user_input + api_status_info,
+            cities=",".join(route["cities"]) if forecasts else "",
+            malformed=",".join(sorted(malformed)),
+            forecast=",".join(forecast.snapshot_id for forecast in forecasts.values()),
+            target_dates=",".join(d.isoformat() for d in target_dates) if forecasts else ""
+        )
+        # Jawaban perbandingan kedaluwarsa bersama prakiraan yang paling cepat basi
+        expiries = [forecast_cache.expires_at(city_cache_key(city)) for city in forecasts]
+        cache_expires_at = min((expiry for expiry in expiries if expiry is not None), default=None)
+
+        yield {"type": "start", "models": self.model_types}
+
+        # Callback fan-out diteruskan lewat queue supaya ketiga stream bisa di-yield sebagai satu urutan event
+        events = asyncio.Queue()
+        with tracer.span("answer_streams") as span:
+            fan_out = asyncio.ensure_future(self.model_manager.fan_out(
+                self.model_types,
+                full_prompt,
+                # JSON mentah hanya diteruskan untuk satu kota; perbandingan cukup lewat prompt
+                next(iter(fetched.values())) if len(fetched) == 1 else None,
+                on_chunk=lambda model_type, text: events.put_nowait({"type": "chunk", "model": model_type, "text": text}),
+                on_done=lambda model_type, status: events.put_nowait({"type": "done", "model": model_type, "status": status}),
+                cache_key=cache_key,
+                cache_expires_at=cache_expires_at
+            ))
+            fan_out.add_done_callback(lambda _: events.put_nowait(None))
+            try:
+                while (event := await events.get()) is not None:
+                    yield event
+                result = fan_out.result()
+            finally:
+                # Klien putus di tengah stream: hentikan semua provider
+                if not fan_out.done():
+                    fan_out.cancel()
+            span.set(statuses=result.statuses, skipped=result.skipped, canonical=result.canonical)
+
+        responses = {
+            model_type: result.responses.get(model_type, NOTICES["skipped"] if model_type in result.skipped else "")
+            for model_type in self.model_types
+        }
+
+        # Jawaban model pertama yang selesai tanpa error dipakai sebagai konteks percakapan
+        if result.canonical:
+            session.context.add("assistant", responses[result.canonical])
+
+        chat_entry = session.store_turn(user_input, responses, list(forecasts.values()))
+        yield {
+            "type": "turn",
+            "id": chat_entry["id"],
+            "canonical": result.canonical,
+            "statuses": result.statuses,
+            "skipped": result.skipped,
+        }
@@ -0,0 +1,79 @@
+"""Provider plugins, imported on first use
+
+A model key (e.g. "llama") maps to a "module:Class" plugin. The built-ins are below; more can be
+added without code changes through the MODEL_PLUGINS setting, or registered from code with
+provider_registry.register(). Only models listed in ENABLED_MODELS (plus ROUTER_MODEL) are ever loaded.
+"""
+import importlib
+import threading
+from typing import Dict, List
+from config import MODELS, MODEL_PLUGINS, ROUTER_MODEL, model_settings
+from .base import Provider
+
+BUILTIN_PLUGINS = {
+    "mistral": "providers.mistral:MistralProvider",
+    "gemini": "providers.gemini:GeminiProvider",
+    "llama": "providers.groq:GroqProvider",
+}
+
+
+class ProviderRegistry:
+    """Lazily instantiated provider plugins for the enabled models"""
+
+    def __init__(self, plugins: Dict[str, str], models: Dict[str, Dict]):
+        self._plugins = dict(plugins)
+        self._models = models
+        self._instances: Dict[str, Provider] = {}
+        self._lock = threading.Lock()
+        self._preloading = False
+
+    def register(self, key: str, target: str):
+        """Map a model key to a "module:Class" plugin (takes effect on the next get)"""
+        with self._lock:
+            self._plugins[key] = target
+            self._instances.pop(key, None)
+
+    @property
+    def enabled(self) -> List[str]:
+        return list(self._models)
+
+    @property
+    def active(self) -> List[str]:
+        """Enabled models plus the router model"""
+        return list(dict.fromkeys([ROUTER_MODEL] + self.enabled))
+
+    def get(self, key: str) -> Provider:
+        provider = self._instances.get(key)
+        if provider is not None:
+            return provider
+        with self._lock:
+            if key not in self._instances:
+                if key not in self._plugins:
+                    raise KeyError(f"No provider plugin registered for model {key!r}")
+                module_name, _, class_name = self._plugins[key].partition(":")
+                plugin = getattr(importlib.import_module(module_name), class_name)
+                self._instances[key] = plugin(key, self._models.get(key) or model_settings(key))
+            return self._instances[key]
+
+    def required_secrets(self) -> List[str]:
+        return [self.get(key).api_key_secret for key in self.active if self.get(key).api_key_secret]
+
+    def preload(self):
+        """Import the active providers' SDKs once, in a background thread, while the first page renders"""
+        with self._lock:
+            if self._preloading:
+                return
+            self._preloading = True
+
+        def run():
+            for key in self.active:
+                try:
+                    self.get(key).preload()
+                except Exception:
+                    # Error yang sama akan muncul lagi (dan dilaporkan) saat provider dipakai
+                    pass
+
+        threading.Thread(target=run, name="provider-preload", daemon=True).start()
+
+
+provider_registry = ProviderRegistry({**BUILTIN_PLUGINS, **MODEL_PLUGINS}, MODELS)
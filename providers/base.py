@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+from typing import AsyncGenerator, Dict, Tuple
+
+
+class Provider(ABC):
+    """One LLM backend; subclasses import their SDK lazily so unused providers cost nothing at startup
+
+    settings is the model's entry in config.MODELS (name, display_name, temperature, max_tokens).
+    """
+
+    label = ""           # Nama singkat untuk pesan error di panel jawaban
+    api_key_secret = ""  # Secret yang wajib ada selama provider ini aktif
+    resource = ""        # Nama klien di resource_pool, dibuang ulang saat koneksi rusak
+
+    def __init__(self, key: str, settings: Dict):
+        self.key = key
+        self.settings = settings
+
+    @property
+    def upstream(self) -> str:
+        """Name of the shared rate limiter / circuit breaker this provider's calls go through"""
+        return self.key
+
+    def preload(self):
+        """Import the SDK ahead of the first request (called from a background thread)"""
+
+    def warm(self):
+        """Build the API client so a broken configuration fails before the first turn"""
+
+    def connection_errors(self) -> Tuple[type, ...]:
+        """Exceptions that mean the cached client is broken and must be rebuilt"""
+        return ()
+
+    @abstractmethod
+    async def complete(self, prompt: str) -> str:
+        """Full non-streaming answer (used by the router)"""
+
+    @abstractmethod
+    def stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+        """Answer chunks; implement as an async generator (async def with yield)"""
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Dict
+from config import get_secret
+from resources import resource_pool
+from .base import Provider
+
+# Klien async google-generativeai terikat ke event loop pertama yang memakainya, jadi panggilan
+# sinkron (gRPC biasa, aman lintas thread) dijalankan di thread pool terbatas
+MAX_THREADS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="gemini")
+_DONE = object()
+
+
+def _configure_genai():
+    import google.generativeai as genai
+    genai.configure(api_key=get_secret("GOOGLE_API_KEY"))
+    return genai
+
+
+def _put(loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, item):
+    try:
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+    except RuntimeError:
+        pass  # Loop pemanggil sudah ditutup; tidak ada lagi yang menunggu
+
+
+class GeminiProvider(Provider):
+    label = "Gemini"
+    api_key_secret = "GOOGLE_API_KEY"
+
+    @property
+    def resource(self):
+        return f"gemini:{self.settings['name']}"
+
+    def preload(self):
+        import google.generativeai  # noqa: F401
+
+    @property
+    def model(self):
+        # Hanya API sinkron yang dipakai (lewat _executor), jadi handle ini aman dibagi semua event loop;
+        # berbeda dengan klien Mistral/Groq yang disimpan per loop
+        genai = resource_pool.get("genai", _configure_genai)
+        return resource_pool.get(self.resource, lambda: genai.GenerativeModel(self.settings["name"]))
+
+    def warm(self):
+        self.model
+
+    def connection_errors(self):
+        from google.api_core import exceptions as google_exceptions
+        return (google_exceptions.ServiceUnavailable,)
+
+    async def complete(self, prompt: str) -> str:
+        response = await asyncio.get_running_loop().run_in_executor(_executor, self.model.generate_content, prompt)
+        return response.text
+
+    async def stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+        """Stream from a worker thread that pushes chunks onto an asyncio.Queue of the calling loop"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        model = self.model
+
+        def produce():
+            try:
+                for chunk in model.generate_content(prompt, stream=True):
+                    if stop.is_set():
+                        return  # Konsumen berhenti (deadline, rerun): lepaskan stream gRPC
+                    if chunk.text:
+                        _put(loop, queue, chunk.text)
+            except BaseException as e:
+                _put(loop, queue, e)
+            else:
+                _put(loop, queue, _DONE)
+
+        _executor.submit(produce)
+        try:
+            while (item := await queue.get()) is not _DONE:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
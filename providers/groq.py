@@ -0,0 +1,57 @@
+from typing import AsyncGenerator, Dict
+from config import get_secret
+from resources import resource_pool
+from .base import Provider
+
+
+def _build_client():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=get_secret("GROQ_API_KEY"))
+
+
+def _groq_is_open(client):
+    return not client.is_closed()
+
+
+class GroqProvider(Provider):
+    """Models served by Groq (Llama by default)"""
+    label = "Llama"
+    api_key_secret = "GROQ_API_KEY"
+    resource = "groq"
+
+    def preload(self):
+        import groq  # noqa: F401
+
+    @property
+    def client(self):
+        return resource_pool.get(self.resource, _build_client, health_check=_groq_is_open, loop_bound=True,
+                                 close=lambda client: client.close())
+
+    def warm(self):
+        self.client
+
+    def connection_errors(self):
+        import groq
+        import httpx
+        return (groq.APIConnectionError, httpx.TransportError)
+
+    async def complete(self, prompt: str) -> str:
+        completion = await self.client.chat.completions.create(
+            model=self.settings["name"],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.settings["temperature"],
+            max_tokens=self.settings["max_tokens"]
+        )
+        return completion.choices[0].message.content
+
+    async def stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+        stream = await self.client.chat.completions.create(
+            model=self.settings["name"],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.settings["temperature"],
+            max_tokens=self.settings["max_tokens"],
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
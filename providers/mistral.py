@@ -0,0 +1,56 @@
+from typing import AsyncGenerator, Dict
+from config import get_secret
+from resources import resource_pool
+from .base import Provider
+
+
+def _build_client():
+    from mistralai import Mistral
+    return Mistral(api_key=get_secret("MISTRAL_API_KEY"))
+
+
+def _close_client(client):
+    # SDK Mistral tidak punya close(); keluar dari async context menutup klien httpx-nya
+    return client.__aexit__(None, None, None)
+
+
+class MistralProvider(Provider):
+    label = "Mistral"
+    api_key_secret = "MISTRAL_API_KEY"
+    resource = "mistral"
+
+    def preload(self):
+        import mistralai  # noqa: F401
+
+    @property
+    def client(self):
+        # Klien httpx async di dalamnya terikat ke event loop, jadi disimpan per loop
+        return resource_pool.get(self.resource, _build_client, loop_bound=True, close=_close_client)
+
+    def warm(self):
+        self.client
+
+    def connection_errors(self):
+        import httpx
+        return (httpx.TransportError,)
+
+    async def complete(self, prompt: str) -> str:
+        completion = await self.client.chat.complete_async(
+            model=self.settings["name"],
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return completion.choices[0].message.content
+
+    async def stream(self, prompt: str, weather_data: Dict = None) -> AsyncGenerator[str, None]:
+        # Pakai API async supaya tiap chunk tidak memblokir event loop
+        stream = await self.client.chat.stream_async(
+            model=self.settings["name"],
+            messages=[{"role": "user", "content": prompt}]
+        )
+        async for chunk in stream:
+            if hasattr(chunk, 'data'):
+                content = chunk.data.choices[0].delta.content
+                if content:
+                    yield content
+            elif hasattr(chunk, 'choices') and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,294 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Optional
+from config import RATE_LIMIT_ENABLED, RATE_LIMIT_RPM, RATE_LIMIT_BURST, RATE_LIMIT_MAX_WAIT, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+
+# Prioritas antrean rate limit: angka kecil didahulukan
+PRIORITY_ROUTER = 0
+PRIORITY_FETCH = 1
+PRIORITY_STREAM = 2
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_MIN_POLL = 0.005
+
+
+class UpstreamUnavailable(Exception):
+    """Call rejected without reaching the upstream: its breaker is open or the rate-limit wait is too long"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable ({reason})")
+        self.upstream = upstream
+        self.reason = reason  # "open" atau "throttled"
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK or aiohttp exception, if any"""
+    for candidate in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status", "code"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def retry_after(error: BaseException) -> float:
+    """Seconds from a Retry-After header on the error's response, 0 when absent"""
+    for candidate in (error, getattr(error, "response", None)):
+        headers = getattr(candidate, "headers", None)
+        if headers is not None:
+            try:
+                return float(headers.get("retry-after") or 0)
+            except (TypeError, ValueError):
+                return 0.0
+    return 0.0
+
+
+def is_failure(error: BaseException) -> bool:
+    """Whether an error says something about the upstream (not about our request)"""
+    status = error_status(error)
+    # Error tanpa status = koneksi/timeout; 4xx lain (mis. 400, 404) tidak menjatuhkan breaker
+    return status is None or status in (408, 429) or status >= 500
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "active", "queued")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.active = True
+        self.queued = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Ticket:
+    """Admission of one call: the breaker generation it was admitted in, and whether it is the half-open probe"""
+    __slots__ = ("generation", "probe")
+
+    def __init__(self, generation: int, probe: bool):
+        self.generation = generation
+        self.probe = probe
+
+
+class _Call:
+    """async with upstream.call(priority): admit, then report the outcome to the breaker"""
+    __slots__ = ("upstream", "priority", "ticket")
+
+    def __init__(self, upstream: "Upstream", priority: int):
+        self.upstream = upstream
+        self.priority = priority
+        self.ticket = None
+
+    async def __aenter__(self):
+        self.ticket = await self.upstream.acquire(self.priority)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.upstream.record(self.ticket)
+        elif issubclass(exc_type, Exception):
+            self.upstream.record(self.ticket, exc)
+        else:
+            # Dibatalkan (deadline, giliran ditutup): bukan bukti upstream sehat atau rusak
+            self.upstream.release(self.ticket)
+        return False
+
+
+class Upstream:
+    """Token bucket, priority wait queue and circuit breaker of one upstream API
+
+    Shared by every session and event loop in the process, so all state sits behind a thread lock
+    and waiters sleep for their expected wait (from their queue position) instead of using
+    loop-bound asyncio primitives. Only the highest-priority waiter may take a token, which lets
+    router calls overtake queued answer streams; a call whose expected wait exceeds max_wait is
+    rejected on entry.
+    The breaker opens after failure_threshold consecutive failures or at once on a 429 (for at
+    least the Retry-After period), rejects calls while open, then lets a single probe through.
+    Every trip starts a new generation; outcomes of calls admitted in an earlier generation are
+    ignored, so only the probe decides whether the breaker closes again.
+    """
+
+    def __init__(self, name: str, rpm: float = 0, burst: int = 1, max_wait: float = 10,
+                 failure_threshold: int = 5, cooldown: float = 30):
+        self.name = name
+        self.rate = rpm / 60
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._waiters = []  # heap _Waiter; yang dibatalkan dibuang malas saat jadi kepala
+        self._seq = itertools.count()
+        self._state = CLOSED
+        self._generation = 0
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "throttled": 0, "rejected": 0, "failures": 0, "trips": 0}
+
+    def call(self, priority: int = PRIORITY_STREAM) -> _Call:
+        return _Call(self, priority)
+
+    async def acquire(self, priority: int = PRIORITY_STREAM) -> Ticket:
+        """Wait for a token; raises UpstreamUnavailable when the breaker rejects or the wait exceeds max_wait"""
+        waiter = _Waiter(priority, next(self._seq))
+        give_up = time.monotonic() + self.max_wait
+        try:
+            while True:
+                ticket = self._try_acquire(waiter, give_up)
+                if isinstance(ticket, Ticket):
+                    return ticket
+                await asyncio.sleep(ticket)
+        finally:
+            waiter.active = False
+
+    def _try_acquire(self, waiter: _Waiter, give_up: float):
+        """A Ticket when admitted, otherwise seconds to sleep before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            self._check_breaker(now)
+            if self.rate > 0:
+                self._refill(now)
+                head = self._head()
+                if (head is not None and head is not waiter) or self._tokens < 1:
+                    return self._queue_delay(waiter, now, give_up)
+                self._tokens -= 1
+                if waiter.queued:
+                    heapq.heappop(self._waiters)
+            probe = self._state == HALF_OPEN
+            if probe:
+                self._probing = True
+            self._stats["calls"] += 1
+            return Ticket(self._generation, probe)
+
+    def _queue_delay(self, waiter: _Waiter, now: float, give_up: float) -> float:
+        """Expected wait from the waiter's queue position; rejects at once when it exceeds give_up"""
+        ahead = sum(1 for other in self._waiters if other.active and other < waiter)
+        delay = max((ahead + 1 - self._tokens) / self.rate, _MIN_POLL)
+        if now + delay > give_up:
+            self._stats["rejected"] += 1
+            raise UpstreamUnavailable(self.name, "throttled")
+        if not waiter.queued:
+            waiter.queued = True
+            heapq.heappush(self._waiters, waiter)
+            self._stats["throttled"] += 1
+        return delay
+
+    def _check_breaker(self, now: float):
+        if self._state == OPEN and now >= self._open_until:
+            self._state = HALF_OPEN
+        if self._state == OPEN or (self._state == HALF_OPEN and self._probing):
+            self._stats["rejected"] += 1
+            raise UpstreamUnavailable(self.name, "open")
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _head(self) -> Optional[_Waiter]:
+        while self._waiters and not self._waiters[0].active:
+            heapq.heappop(self._waiters)
+        return self._waiters[0] if self._waiters else None
+
+    def record(self, ticket: Ticket, error: BaseException = None):
+        """Report the outcome of an admitted call (error None = success)"""
+        with self._lock:
+            if ticket.generation != self._generation:
+                # Diizinkan sebelum breaker trip; hasilnya tidak mengatakan apa-apa tentang keadaan sekarang
+                return
+            if ticket.probe:
+                self._probing = False
+            failed = error is not None and is_failure(error)
+            if not failed:
+                self._failures = 0
+                if ticket.probe:
+                    self._state = CLOSED
+                return
+            self._failures += 1
+            self._stats["failures"] += 1
+            status = error_status(error)
+            if status == 429:
+                # Kuota habis: jangan biarkan waiter lain langsung menembak lagi
+                self._tokens = 0.0
+            if self.failure_threshold and (
+                status == 429 or ticket.probe or self._failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._generation += 1
+                self._open_until = time.monotonic() + max(self.cooldown, retry_after(error) if status == 429 else 0)
+                self._stats["trips"] += 1
+
+    def release(self, ticket: Ticket):
+        """Give back a half-open probe slot without a verdict (the call was cancelled)"""
+        with self._lock:
+            if ticket.probe and ticket.generation == self._generation:
+                self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._open_until:
+                return HALF_OPEN
+            return self._state
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            if self.rate > 0:
+                self._refill(time.monotonic())
+            return {
+                **self._stats,
+                "queue_depth": sum(1 for waiter in self._waiters if waiter.active),
+                "tokens": round(self._tokens, 2) if self.rate > 0 else 0,
+                "breaker_state": _STATE_GAUGE[state],
+                "consecutive_failures": self._failures,
+            }
+
+
+class UpstreamRegistry:
+    """One Upstream per API name, created on first use; names without a configured rate are not throttled"""
+
+    def __init__(self, rpm: Dict[str, float], burst: int = 3, max_wait: float = 10,
+                 failure_threshold: int = 5, cooldown: float = 30):
+        self.rpm = dict(rpm)
+        self.burst = burst
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._upstreams: Dict[str, Upstream] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            with self._lock:
+                upstream = self._upstreams.setdefault(name, Upstream(
+                    name, self.rpm.get(name, 0), self.burst, self.max_wait, self.failure_threshold, self.cooldown
+                ))
+        return upstream
+
+    def stats(self) -> Dict:
+        with self._lock:
+            upstreams = dict(self._upstreams)
+        return {
+            f"{name}_{key}": value
+            for name, upstream in sorted(upstreams.items())
+            for key, value in upstream.stats().items()
+        }
+
+
+upstreams = UpstreamRegistry(
+    RATE_LIMIT_RPM if RATE_LIMIT_ENABLED else {},
+    burst=RATE_LIMIT_BURST,
+    max_wait=RATE_LIMIT_MAX_WAIT,
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    cooldown=BREAKER_COOLDOWN
+)
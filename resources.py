@@ -0,0 +1,125 @@
+import asyncio
+import inspect
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+
+class ResourcePool:
+    """Process-wide registry of long-lived clients, rebuilt when a health check fails or after invalidate()
+
+    Loop-bound resources (async HTTP clients, aiohttp sessions) are kept once per event loop,
+    since their connection pools cannot be shared across loops. main.py keeps one loop per
+    browser session, so those survive reruns as well, and calls close_loop() when the session ends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared: Dict[str, Any] = {}
+        self._per_loop: Dict[str, "weakref.WeakKeyDictionary"] = {}
+        self._closers: Dict[str, Callable[[Any], Any]] = {}
+        self._stats = {"hits": 0, "builds": 0, "rebuilds": 0, "invalidations": 0}
+
+    def get(self, name: str, factory: Callable[[], Any], health_check: Optional[Callable[[Any], bool]] = None,
+            loop_bound: bool = False, close: Optional[Callable[[Any], Any]] = None) -> Any:
+        """Return the cached resource, building it with factory if missing or unhealthy
+
+        Loop-bound resources must be requested from inside a running event loop; close (sync or
+        async) releases one of them in invalidate() and close_loop(). factory runs outside the
+        pool lock, so a slow SDK import or configure call does not block other lookups.
+        """
+        slot = asyncio.get_running_loop() if loop_bound else name
+        with self._lock:
+            if close is not None:
+                self._closers[name] = close
+            store = self._store(name, loop_bound)
+            resource = store.get(slot)
+            if resource is not None and (health_check is None or self._healthy(resource, health_check)):
+                self._stats["hits"] += 1
+                return resource
+            stale = resource
+
+        built = factory()
+        with self._lock:
+            current = store.get(slot)
+            if current is not None and current is not stale:
+                # Thread lain sudah membangun lebih dulu: pakai miliknya, buang hasil kita
+                self._stats["hits"] += 1
+                extra = built
+            else:
+                self._stats["rebuilds" if stale is not None else "builds"] += 1
+                store[slot] = current = built
+                extra = None
+        if extra is not None:
+            self._close(name, extra)
+        return current
+
+    def invalidate(self, name: str):
+        """Drop and close a resource so the next get() rebuilds it
+
+        For loop-bound resources only the running loop's client is dropped; other sessions keep theirs.
+        """
+        with self._lock:
+            self._stats["invalidations"] += 1
+            if name in self._per_loop:
+                try:
+                    resource = self._per_loop[name].pop(asyncio.get_running_loop(), None)
+                except RuntimeError:
+                    resource = None  # Tidak ada loop berjalan, jadi tidak ada klien loop ini
+            else:
+                resource = self._shared.pop(name, None)
+        if resource is not None:
+            self._close(name, resource)
+
+    def _close(self, name: str, resource):
+        """Run the registered closer; an async one is scheduled on the running loop"""
+        close = self._closers.get(name)
+        if close is None:
+            return
+        try:
+            result = close(resource)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+        except Exception:
+            pass  # Klien yang gagal ditutup akan dibereskan GC
+
+    async def close_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> int:
+        """Close and forget the loop-bound resources of loop (default: the running loop); must run on that loop"""
+        loop = loop or asyncio.get_running_loop()
+        with self._lock:
+            owned = [(name, store.pop(loop)) for name, store in self._per_loop.items() if loop in store]
+            closers = dict(self._closers)
+        for name, resource in owned:
+            close = closers.get(name)
+            if close is None:
+                continue
+            try:
+                result = close(resource)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                pass  # Tetap tutup resource lain; yang gagal akan dibereskan GC
+        return len(owned)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "shared": sorted(self._shared),
+                "per_loop": {name: len(store) for name, store in self._per_loop.items()},
+            }
+
+    def _store(self, name: str, loop_bound: bool):
+        if not loop_bound:
+            return self._shared
+        return self._per_loop.setdefault(name, weakref.WeakKeyDictionary())
+
+    @staticmethod
+    def _healthy(resource, health_check) -> bool:
+        try:
+            return bool(health_check(resource))
+        except Exception:
+            return False
+
+
+resource_pool = ResourcePool()
@@ -0,0 +1,58 @@
+import hashlib
+import time
+from typing import Dict, Optional
+from config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_BYPASS, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_CHARS, RESPONSE_CACHE_TTL
+from lru import LRUCache
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value).lower().split())
+
+
+def make_prompt_key(**inputs) -> str:
+    """Hash normalized prompt template inputs (template, context, prompt, forecast snapshot, ...); None inputs are left out"""
+    payload = "\x1f".join(f"{name}={_normalize(inputs[name])}" for name in sorted(inputs) if inputs[name] is not None)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Process-wide LRU cache of complete model answers, bounded by entries and total characters"""
+
+    def __init__(self, enabled: bool = True, bypass=(), max_entries: int = 256, max_chars: int = 2_000_000,
+                 default_ttl: float = 600):
+        self.enabled = enabled
+        self.bypass = set(bypass)
+        self.max_chars = max_chars
+        self.default_ttl = default_ttl
+        self._entries = LRUCache(max_entries, max_weight=max_chars, weigh=len, counters=("bypassed",))
+
+    def is_active(self, model_type: str) -> bool:
+        """False when caching is off globally or for this model"""
+        if not self.enabled or model_type in self.bypass:
+            self._entries.count("bypassed")
+            return False
+        return True
+
+    def get(self, model_type: str, prompt_key: str) -> Optional[str]:
+        return self._entries.get((model_type, prompt_key))
+
+    def set(self, model_type: str, prompt_key: str, text: str, expires_at: Optional[float] = None):
+        """Store a complete answer until expires_at (e.g. the forecast's next update) or the default TTL"""
+        if not text or len(text) > self.max_chars:
+            return
+        self._entries.set((model_type, prompt_key), text, expires_at or time.time() + self.default_ttl)
+
+    def stats(self) -> Dict:
+        return {**self._entries.stats(), "chars": self._entries.weight}
+
+    def clear(self):
+        self._entries.clear()
+
+
+response_cache = ResponseCache(
+    enabled=RESPONSE_CACHE_ENABLED,
+    bypass=RESPONSE_CACHE_BYPASS,
+    max_entries=RESPONSE_CACHE_SIZE,
+    max_chars=RESPONSE_CACHE_MAX_CHARS,
+    default_ttl=RESPONSE_CACHE_TTL
+)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+from datetime import date
+from typing import Dict, List, Optional
+from config import ROUTE_CACHE_SIZE
+from lexicon import query_classifier
+from lru import LRUCache
+
+UNKNOWN_CITY = "lokasi%20tidak%20diketahui"
+
+# Skema keluaran QUERY_ROUTER_PROMPT: nama key -> tipe yang diizinkan
+ROUTE_SCHEMA = {
+    "is_weather": (bool,),
+    "cities": (list,),
+    "target_date": (str, type(None)),
+}
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def normalize_city(city: Optional[str]) -> Optional[str]:
+    """Normalize a city name into the '%20' form used by the weather API"""
+    if not city:
+        return None
+    city = " ".join(city.strip().lower().replace("%20", " ").split())
+    if not city or city == UNKNOWN_CITY.replace("%20", " "):
+        return None
+    return city.replace(" ", "%20")
+
+
+def normalize_cities(cities) -> List[str]:
+    """Normalize city names, dropping unknown ones and duplicates (order kept)"""
+    return list(dict.fromkeys(city for city in map(normalize_city, cities) if city))
+
+
+def parse_route_response(text: str) -> Optional[Dict]:
+    """Parse and validate the router JSON, returning None if it does not match ROUTE_SCHEMA"""
+    if not text:
+        return None
+    try:
+        data = json.loads(_CODE_FENCE.sub("", text.strip()))
+    except ValueError:
+        return None
+
+    if not isinstance(data, dict) or set(data) != set(ROUTE_SCHEMA):
+        return None
+    for key, types in ROUTE_SCHEMA.items():
+        if not isinstance(data[key], types):
+            return None
+    if not all(isinstance(city, str) for city in data["cities"]):
+        return None
+
+    target_date = data["target_date"]
+    if target_date is not None:
+        try:
+            target_date = date.fromisoformat(target_date)
+        except ValueError:
+            return None
+
+    return {
+        "is_weather": data["is_weather"],
+        "cities": normalize_cities(data["cities"]),
+        "target_date": target_date,
+    }
+
+
+def depends_on_context(prompt: str, route: Dict) -> bool:
+    """Whether a route may have been resolved from the conversation rather than from the prompt alone
+
+    Only a prompt that names cities itself, covers every city of the route and has no reference
+    back ("disana", "bandingkan dengan ...") is context-free; follow-ups such as "Kalau besok?"
+    or "Kalau Bandung?" after a comparison are not.
+    """
+    if query_classifier.is_context_dependent(prompt):
+        return True
+    named = {city.replace(" ", "%20") for city in query_classifier.find_cities(prompt)}
+    return not named or not set(route["cities"]) <= named
+
+
+class RouteCache:
+    """Process-wide LRU of LLM routing decisions keyed on the normalized prompt
+
+    Routes that depend_on_context() are stored under a key that also covers the conversation
+    context, so a follow-up resolved for one session is never replayed to another; the rest
+    are shared by every session asking the same prompt. The date is always part of the key
+    because target_date is resolved relative to today.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self._entries = LRUCache(max_entries, counters=("invalidations", "llm_calls_saved"))
+
+    @staticmethod
+    def key(prompt: str, context: Optional[str] = None, today: Optional[date] = None) -> str:
+        """Key of a prompt-only route, or of a route resolved under context when context is given"""
+        parts = [" ".join(prompt.lower().split()), (today or date.today()).isoformat()]
+        if context is not None:
+            parts.append("context:" + " ".join(context.lower().split()))
+        return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, context: str = "") -> Optional[Dict]:
+        with self._entries.lock:
+            for key in (self.key(prompt), self.key(prompt, context)):
+                route = self._entries.get(key, record=False)
+                if route is not None:
+                    self._entries.count("hits")
+                    self._entries.count("llm_calls_saved")
+                    return dict(route, cities=list(route["cities"]))
+            self._entries.count("misses")
+            return None
+
+    def set(self, prompt: str, context: str, route: Dict):
+        key = self.key(prompt, context) if depends_on_context(prompt, route) else self.key(prompt)
+        entry = {name: route[name] for name in ROUTE_SCHEMA}
+        entry["cities"] = list(route["cities"])
+        self._entries.set(key, entry)
+
+    def invalidate(self, prompt: str, context: str = "") -> bool:
+        """Forget one (misclassified) decision; returns True if it was cached"""
+        with self._entries.lock:
+            removed = False
+            for key in (self.key(prompt), self.key(prompt, context)):
+                removed = self._entries.pop(key) or removed
+            if removed:
+                self._entries.count("invalidations")
+            return removed
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return self._entries.stats()
+
+
+route_cache = RouteCache(ROUTE_CACHE_SIZE)
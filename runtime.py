@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from resources import resource_pool
+
+_background_loop = None
+_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop that runs work which must outlive a single session run"""
+    global _background_loop
+    with _lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="chatcuaca-background", daemon=True)
+            thread.start()
+            _background_loop = loop
+        return _background_loop
+
+
+def submit(coro) -> Future:
+    """Schedule coro on the background loop and return a thread-safe future"""
+    return asyncio.run_coroutine_threadsafe(coro, background_loop())
+
+
+class SessionLoop:
+    """Event loop owned by one browser session; closed with its pooled clients once the session is garbage collected"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        finalizer = weakref.finalize(self, _close_soon, self.loop)
+        finalizer.atexit = False  # Saat proses berhenti semuanya ikut mati
+
+    def run(self, coro):
+        """Run coro to completion on this session's loop, cancelling whatever it leaves behind"""
+        loop = self.loop
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            # Sama seperti asyncio.run: batalkan task yang tertinggal (mis. saat rerun di tengah streaming)
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            asyncio.set_event_loop(None)
+
+
+def _close_soon(loop: asyncio.AbstractEventLoop):
+    # Finalizer bisa dipanggil GC di thread mana saja, termasuk di tengah loop sesi lain yang sedang
+    # berjalan, jadi penutupan dikerjakan di thread tersendiri
+    threading.Thread(target=_close_loop, args=(loop,), name="chatcuaca-loop-close", daemon=True).start()
+
+
+def _close_loop(loop: asyncio.AbstractEventLoop):
+    if loop.is_closed():
+        return
+    try:
+        loop.run_until_complete(resource_pool.close_loop(loop))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
@@ -0,0 +1,156 @@
+"""Headless HTTP API for the chat pipeline; answers stream as multiplexed Server-Sent Events.
+
+    python server.py --port 8080
+
+    POST   /sessions                   -> {"session_id": "..."}
+    POST   /sessions/{id}/turns        {"message": "...", "use_weather_api": true} -> text/event-stream
+    GET    /sessions/{id}              chat history of the session
+    DELETE /sessions/{id}
+    GET    /metrics                    Prometheus text format
+    GET    /healthz
+
+Every pipeline event is one SSE message whose event name is the event type; chunks of all
+models share the stream and carry their model key, e.g.
+
+    event: chunk
+    data: {"type": "chunk", "model": "gemini", "text": "Cuaca di Jakarta..."}
+"""
+import argparse
+import json
+import sys
+
+from aiohttp import web
+
+from config import REQUIRED_API_KEYS, SERVER_HOST, SERVER_PORT, SESSION_STORE_MAX_SESSIONS, SESSION_IDLE_TTL, has_secret
+from models import model_manager
+from providers import provider_registry
+from pipeline import ChatPipeline
+from sessions import MemorySessionStore
+from telemetry import tracer
+
+MAX_MESSAGE_CHARS = 2000
+
+
+def _json(data) -> str:
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def _session_or_404(request):
+    session = request.app["sessions"].get(request.match_info["session_id"])
+    if session is None:
+        raise web.HTTPNotFound(text=_json({"error": "unknown session"}), content_type="application/json")
+    return session
+
+
+async def create_session(request):
+    session = request.app["sessions"].create()
+    return web.json_response({"session_id": session.id}, status=201)
+
+
+async def get_session(request):
+    session = _session_or_404(request)
+    history = [
+        {
+            "id": chat["id"],
+            "date": chat["date"].isoformat(),
+            "user_input": chat["user_input"],
+            "responses": chat["responses"],
+            "forecasts": [
+                session.forecasts[key].to_text(chat["date"])
+                for key in chat.get("forecast_keys", ()) if key in session.forecasts
+            ],
+        }
+        for chat in session.chat_history
+    ]
+    return web.json_response({"session_id": session.id, "history": history}, dumps=_json)
+
+
+async def delete_session(request):
+    request.app["sessions"].delete(request.match_info["session_id"])
+    return web.Response(status=204)
+
+
+async def post_turn(request):
+    session = _session_or_404(request)
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=_json({"error": "body must be JSON"}), content_type="application/json")
+    message = str(body.get("message", "")).strip()
+    if not message or len(message) > MAX_MESSAGE_CHARS:
+        raise web.HTTPBadRequest(text=_json({"error": f"message must be 1-{MAX_MESSAGE_CHARS} characters"}),
+                                 content_type="application/json")
+    if session.busy:
+        # Satu giliran per sesi; giliran berikutnya butuh jawaban sebelumnya sebagai konteks
+        raise web.HTTPConflict(text=_json({"error": "a turn is already running for this session"}),
+                               content_type="application/json")
+    # Ditandai sebelum await pertama, supaya POST kedua yang bersamaan langsung kena 409
+    session.busy = True
+
+    events = None
+    try:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        events = request.app["pipeline"].run_turn(session, message, bool(body.get("use_weather_api", True)))
+        try:
+            async for event in events:
+                await response.write(f"event: {event['type']}\ndata: {_json(event)}\n\n".encode("utf-8"))
+        except ConnectionResetError:
+            # Klien menutup koneksi; aclose() di bawah membatalkan stream provider yang tersisa
+            pass
+    finally:
+        if events is not None:
+            await events.aclose()
+        session.busy = False
+        request.app["sessions"].save(session)
+    return response
+
+
+async def metrics(request):
+    return web.Response(text=tracer.render_prometheus(), content_type="text/plain")
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def _on_startup(app):
+    # Klien provider yang terikat loop dibuat di loop server
+    model_manager.initialize_clients()
+
+
+def create_app(session_store=None) -> web.Application:
+    app = web.Application()
+    app["sessions"] = session_store or MemorySessionStore(SESSION_STORE_MAX_SESSIONS, SESSION_IDLE_TTL)
+    app["pipeline"] = ChatPipeline(model_manager)
+    if hasattr(app["sessions"], "stats"):
+        tracer.register_collector("sessions", app["sessions"].stats)
+    app.on_startup.append(_on_startup)
+    app.router.add_post("/sessions", create_session)
+    app.router.add_get("/sessions/{session_id}", get_session)
+    app.router.add_delete("/sessions/{session_id}", delete_session)
+    app.router.add_post("/sessions/{session_id}/turns", post_turn)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
+
+    missing = [key for key in REQUIRED_API_KEYS + provider_registry.required_secrets() if not has_secret(key)]
+    if missing:
+        sys.exit(f"Missing {', '.join(missing)} in environment or secrets.toml")
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional
+from config import (
+    SESSION_MEMORY_MAX_CHARS, MESSAGE_HISTORY_LIMIT, CONTEXT_ANSWER_TOKENS, CONTEXT_SUMMARY, CONTEXT_SUMMARY_TOKENS
+)
+from context import ConversationContext
+from lexicon import query_classifier
+
+
+class Session:
+    """Conversation state of one client: chat history, model context and the forecasts it references"""
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.id = session_id or uuid.uuid4().hex
+        self.chat_history = []
+        self.context = ConversationContext(MESSAGE_HISTORY_LIMIT, CONTEXT_SUMMARY, CONTEXT_SUMMARY_TOKENS)
+        self.forecasts = {}  # snapshot_id -> Forecast, dirujuk oleh chat_history
+        self.turn_counter = 0
+        self.last_cities = []
+        self.busy = False
+        self.last_seen = time.monotonic()
+
+    def format_chat_context(self, budget=CONTEXT_ANSWER_TOKENS):
+        """Recent conversation for model prompts, limited to budget tokens (memoized until the next message)"""
+        return self.context.render(budget)
+
+    def guess_cities(self, prompt):
+        """Cheap guess of the cities a query is about: gazetteer matches, else the previous turn's cities for follow-ups"""
+        cities = query_classifier.find_cities(prompt)
+        if not cities and query_classifier.is_context_dependent(prompt):
+            # Hanya pertanyaan lanjutan ("Kalau besok?") yang mewarisi kota giliran sebelumnya
+            return list(self.last_cities)
+        return cities
+
+    def store_turn(self, user_input, responses, forecasts=()):
+        """Append a compact chat history entry and enforce the per-session memory cap"""
+        self.turn_counter += 1
+        chat_entry = {
+            "id": self.turn_counter,
+            "date": date.today(),
+            "user_input": user_input,
+            "responses": responses,
+            "size": len(user_input) + sum(len(text) for text in responses.values())
+        }
+        if forecasts:
+            # Prakiraan disimpan sekali per snapshot dan hanya dirujuk dari tiap giliran
+            for forecast in forecasts:
+                self.forecasts.setdefault(forecast.snapshot_id, forecast)
+            chat_entry["forecast_keys"] = [forecast.snapshot_id for forecast in forecasts]
+        self.chat_history.append(chat_entry)
+        self.enforce_session_cap()
+        return chat_entry
+
+    def enforce_session_cap(self):
+        """Drop the oldest turns (and forecasts nobody references) until the session fits its budget"""
+        history = self.chat_history
+        forecasts = self.forecasts
+
+        # Teks prakiraan dihitung sekali per snapshot, bukan per giliran
+        references = {}
+        for chat in history:
+            for key in chat.get("forecast_keys", ()):
+                if key in forecasts:
+                    references[key] = references.get(key, 0) + 1
+        total = sum(chat["size"] for chat in history) + sum(len(forecasts[key].to_text()) for key in references)
+
+        while len(history) > 1 and total > SESSION_MEMORY_MAX_CHARS:
+            chat = history.pop(0)
+            total -= chat["size"]
+            for key in chat.get("forecast_keys", ()):
+                if key in references:
+                    references[key] -= 1
+                    if not references[key]:
+                        total -= len(forecasts[key].to_text())
+                        del references[key]
+        for key in [key for key in forecasts if key not in references]:
+            del forecasts[key]
+
+
+class SessionStore(ABC):
+    """Where conversations live between turns; implement get/save/delete for other backends"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Session]:
+        """The stored session, or None if it does not exist (or has expired)"""
+
+    @abstractmethod
+    def save(self, session: Session):
+        """Store session under session.id"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session; unknown ids are ignored"""
+
+    def create(self, session_id: Optional[str] = None) -> Session:
+        session = Session(session_id)
+        self.save(session)
+        return session
+
+    def get_or_create(self, session_id: str) -> Session:
+        return self.get(session_id) or self.create(session_id)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store bounded by session count and idle time (least recently used goes first)"""
+
+    def __init__(self, max_sessions: int = 10_000, idle_ttl: float = 3600):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "evicted": 0, "expired": 0}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if not session.busy and time.monotonic() - session.last_seen > self.idle_ttl:
+                del self._sessions[session_id]
+                self._stats["expired"] += 1
+                return None
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: Session):
+        with self._lock:
+            if session.id not in self._sessions:
+                self._stats["created"] += 1
+            session.last_seen = time.monotonic()
+            self._sessions[session.id] = session
+            self._sessions.move_to_end(session.id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._sessions)}
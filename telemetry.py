@@ -0,0 +1,269 @@
+import asyncio
+import contextvars
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncGenerator, Callable, Dict, Optional
+from config import TRACE_ENABLED, TRACE_SAMPLE_RATE, TRACE_FILE, METRICS_HOST, METRICS_PORT
+
+_current_trace = contextvars.ContextVar("chatcuaca_trace", default=None)
+
+# Nilai collector yang berakhiran ini adalah keadaan saat ini (gauge); sisanya penghitung kumulatif
+_GAUGE_SUFFIXES = ("rate", "size", "chars", "depth", "tokens", "state", "consecutive_failures", "samples", "seconds", "_us")
+
+
+class _NoopSpan:
+    """Shared do-nothing span and context manager used when tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "start", "attrs")
+
+    def __init__(self, name: str, trace_id: str, attrs: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.start = time.perf_counter()
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Timed spans per turn stage and provider call, exported to JSONL and Prometheus text format
+
+    Aggregated metrics are kept for every call while enabled; JSONL span records are written
+    only for sampled turns. When disabled, span() and trace() return shared no-op objects.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0, trace_file: Optional[str] = None):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.trace_file = trace_file
+        self._lock = threading.Lock()
+        self._file = None
+        self._durations: Dict[str, list] = {}  # nama span -> [count, total_seconds, errors]
+        self._providers: Dict[str, Dict[str, float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+        self._server = None
+
+    def trace(self, name: str, **attrs):
+        """Root span for one turn; decides sampling for every span inside it"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._trace(name, attrs)
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._span(name, attrs)
+
+    @contextmanager
+    def _trace(self, name: str, attrs: Dict):
+        sampled = random.random() < self.sample_rate
+        token = _current_trace.set((uuid.uuid4().hex[:16], sampled))
+        try:
+            with self._span(name, attrs) as span:
+                yield span
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def _span(self, name: str, attrs: Dict):
+        trace_id, sampled = _current_trace.get() or (None, False)
+        span = Span(name, trace_id, attrs)
+        error = None
+        try:
+            yield span
+        except (GeneratorExit, asyncio.CancelledError):
+            # Stream dihentikan oleh pemanggil (mis. rerun), bukan kegagalan
+            span.set(cancelled=True)
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - span.start
+            self._observe(name, duration, error is not None or "error" in span.attrs)
+            if sampled:
+                self._export(span, duration, error)
+
+    def instrument_stream(self, model_type: str, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        """Record TTFT, inter-chunk gaps, chunks/sec, output size and errors of a provider stream"""
+        if not self.enabled:
+            return stream
+        return self._instrumented(model_type, stream)
+
+    async def _instrumented(self, model_type: str, stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        with self._span(f"provider.{model_type}.stream", {"model": model_type}) as span:
+            start = last = time.perf_counter()
+            ttft = None
+            chunks = chars = 0
+            max_gap = 0.0
+            try:
+                async for chunk in stream:
+                    now = time.perf_counter()
+                    if ttft is None:
+                        ttft = now - start
+                    else:
+                        max_gap = max(max_gap, now - last)
+                    last = now
+                    chunks += 1
+                    chars += len(chunk)
+                    yield chunk
+            except Exception as e:
+                span.set(error=f"{type(e).__name__}: {e}")
+                self._observe_provider(model_type, ttft, chunks, chars, last - start, error=True)
+                raise
+            elapsed = last - start
+            span.set(
+                ttft_ms=round(ttft * 1000, 1) if ttft is not None else None,
+                chunks=chunks,
+                output_chars=chars,
+                max_gap_ms=round(max_gap * 1000, 1),
+                mean_gap_ms=round((elapsed - (ttft or 0)) / (chunks - 1) * 1000, 1) if chunks > 1 else None,
+                chunks_per_sec=round(chunks / elapsed, 1) if elapsed > 0 else None,
+            )
+            self._observe_provider(model_type, ttft, chunks, chars, elapsed, error=False)
+
+    def record_error(self, model_type: str):
+        """Count a non-streaming provider failure that was turned into inline error text"""
+        if self.enabled:
+            with self._lock:
+                self._provider_stats(model_type)["errors"] += 1
+
+    def register_collector(self, name: str, collector: Callable[[], Dict]):
+        """Expose a component's stats() dict as Prometheus metrics (chatcuaca_<name>_<key>)
+
+        Keys ending in one of _GAUGE_SUFFIXES (sizes, rates, queue depth, ...) are typed as gauges,
+        all other numeric values as counters.
+        """
+        self._collectors[name] = collector
+
+    def _observe(self, name: str, duration: float, error: bool):
+        with self._lock:
+            entry = self._durations.setdefault(name, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] += int(error)
+
+    def _provider_stats(self, model_type: str) -> Dict[str, float]:
+        return self._providers.setdefault(model_type, {
+            "streams": 0, "errors": 0, "ttft_seconds_sum": 0.0, "ttft_count": 0,
+            "chunks": 0, "output_chars": 0, "stream_seconds_sum": 0.0,
+        })
+
+    def _observe_provider(self, model_type, ttft, chunks, chars, elapsed, error):
+        with self._lock:
+            stats = self._provider_stats(model_type)
+            stats["streams"] += 1
+            stats["errors"] += int(error)
+            if ttft is not None:
+                stats["ttft_seconds_sum"] += ttft
+                stats["ttft_count"] += 1
+            stats["chunks"] += chunks
+            stats["output_chars"] += chars
+            stats["stream_seconds_sum"] += elapsed
+
+    def _export(self, span: Span, duration: float, error: Optional[BaseException]):
+        record = {
+            "trace_id": span.trace_id,
+            "span": span.name,
+            "duration_ms": round(duration * 1000, 2),
+            "ts": time.time(),
+            **span.attrs,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        self._write(record)
+
+    def _write(self, record: Dict):
+        if not self.trace_file:
+            return
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.trace_file, "a", encoding="utf-8", buffering=1)
+            self._file.write(line + "\n")
+
+    def render_prometheus(self) -> str:
+        """Current metrics in the Prometheus text exposition format"""
+        with self._lock:
+            durations = {name: list(values) for name, values in self._durations.items()}
+            providers = {name: dict(values) for name, values in self._providers.items()}
+        # Satu baris TYPE per family, sampel family yang sama harus berurutan
+        lines = ["# TYPE chatcuaca_span_seconds summary"]
+        for name, (count, total, _) in sorted(durations.items()):
+            lines.append(f'chatcuaca_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'chatcuaca_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append("# TYPE chatcuaca_span_errors_total counter")
+        for name, (_, _, errors) in sorted(durations.items()):
+            lines.append(f'chatcuaca_span_errors_total{{span="{name}"}} {errors}')
+        keys = sorted({key for stats in providers.values() for key in stats})
+        for key in keys:
+            # Semua statistik provider terus bertambah (jumlah, total detik), jadi counter
+            lines.append(f"# TYPE chatcuaca_provider_{key} counter")
+            for model, stats in sorted(providers.items()):
+                if key in stats:
+                    lines.append(f'chatcuaca_provider_{key}{{model="{model}"}} {stats[key]}')
+        for component, collector in sorted(self._collectors.items()):
+            try:
+                stats = collector()
+            except Exception:
+                continue
+            for key, value in sorted(stats.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    kind = "gauge" if key.endswith(_GAUGE_SUFFIXES) else "counter"
+                    lines.append(f"# TYPE chatcuaca_{component}_{key} {kind}")
+                    lines.append(f"chatcuaca_{component}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def start_metrics_server(self, port: int, host: str = "127.0.0.1"):
+        """Serve GET /metrics on host:port from a daemon thread (idempotent)"""
+        with self._lock:
+            if self._server is not None or not port:
+                return
+            tracer = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?", 1)[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = tracer.render_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError:
+                # Port sudah dipakai (mis. proses lain); metrik tetap tersedia lewat render_prometheus()
+                return
+            threading.Thread(target=self._server.serve_forever, name="chatcuaca-metrics", daemon=True).start()
+
+
+tracer = Tracer(TRACE_ENABLED, TRACE_SAMPLE_RATE, TRACE_FILE or None)
+if TRACE_ENABLED:
+    tracer.start_metrics_server(METRICS_PORT, METRICS_HOST)
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Modul aplikasi ada di root repo (tanpa package), jadi tambahkan ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Setting wajib yang biasanya ada di secrets.toml; nilai palsu cukup karena test tidak memanggil API
+for _key in ("MISTRAL", "GEMINI", "LLAMA"):
+    os.environ.setdefault(f"{_key}_MODEL_NAME", f"{_key.lower()}-test")
+    os.environ.setdefault(f"{_key}_DISPLAY_NAME", _key.title())
+os.environ.setdefault("WEATHER_API_URL", "http://127.0.0.1:9/forecast")
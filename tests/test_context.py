@@ -0,0 +1,53 @@
+from context import ConversationContext, count_tokens
+
+
+def test_newest_messages_fill_the_budget():
+    context = ConversationContext(max_messages=10)
+    for i in range(5):
+        context.add("user", f"pertanyaan {i}")
+        context.add("assistant", f"jawaban {i}")
+    text = context.render(budget=count_tokens("Assistant: jawaban 4") * 2 + 2)
+    assert text.splitlines() == ["Human: pertanyaan 4", "Assistant: jawaban 4"]
+
+
+def test_oversized_latest_message_is_truncated():
+    context = ConversationContext()
+    context.add("assistant", "x" * 400)
+    text = context.render(budget=20)
+    assert text.startswith("Assistant: x") and text.endswith("…")
+    assert count_tokens(text) <= 21
+
+
+def test_gists_stand_in_for_older_messages_when_summary_is_on():
+    long_answer = "Besok Jakarta cerah. " + "Detail suhu dan angin. " * 20
+    context = ConversationContext(max_messages=2, summary=True, summary_tokens=50)
+    context.add("user", "Cuaca Jakarta besok?")
+    context.add("assistant", long_answer)
+    context.add("user", "Bagaimana dengan Bandung?")
+    text = context.render(budget=60)
+    assert "(Human: Cuaca Jakarta besok?)" in text
+    assert "(Assistant: Besok Jakarta cerah.)" in text
+    assert text.endswith("Human: Bagaimana dengan Bandung?")
+
+
+def test_evicted_gists_are_bounded_by_summary_tokens():
+    context = ConversationContext(max_messages=1, summary=True, summary_tokens=20)
+    for i in range(50):
+        context.add("user", f"pertanyaan nomor {i}.")
+    assert context._evicted_tokens <= 20
+    assert len(context._evicted) < 5
+
+    context = ConversationContext(max_messages=1, summary=False)
+    for i in range(5):
+        context.add("user", f"pertanyaan nomor {i}.")
+    assert not context._evicted
+    assert context.render(budget=1000) == "Human: pertanyaan nomor 4."
+
+
+def test_render_is_cached_until_the_next_message():
+    context = ConversationContext()
+    context.add("user", "halo")
+    first = context.render(budget=100)
+    assert context.render(budget=100) is first
+    context.add("assistant", "hai")
+    assert context.render(budget=100) == "Human: halo\nAssistant: hai"
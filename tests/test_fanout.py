@@ -0,0 +1,74 @@
+import pytest
+
+from fanout import FanoutPolicy, FanoutResult, ProviderHealth
+
+MODELS = ["mistral", "gemini", "llama"]
+
+
+def observe(health, model_type, latencies, errors=0):
+    for index, latency in enumerate(latencies):
+        health.observe(model_type, latency, ok=index >= errors)
+
+
+def test_health_snapshot():
+    health = ProviderHealth()
+    observe(health, "gemini", [float(i) for i in range(1, 21)], errors=5)
+    snapshot = health.snapshot("gemini")
+    assert snapshot["samples"] == 20
+    assert snapshot["p95"] == 19.0
+    assert snapshot["error_rate"] == 0.25
+    assert health.snapshot("llama") == {"samples": 0, "p95": None, "error_rate": 0.0}
+
+
+def test_old_samples_expire():
+    health = ProviderHealth(window_seconds=0)
+    observe(health, "gemini", [1.0], errors=1)
+    assert health.snapshot("gemini")["samples"] == 0
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FanoutPolicy(ProviderHealth(), mode="fastest")
+
+
+def test_models_without_enough_samples_are_healthy():
+    health = ProviderHealth()
+    observe(health, "llama", [1.0] * 4, errors=4)
+    policy = FanoutPolicy(health, min_samples=5)
+    assert policy.select(MODELS) == MODELS
+
+
+def test_unhealthy_models_are_skipped():
+    health = ProviderHealth()
+    observe(health, "llama", [1.0] * 10, errors=8)
+    observe(health, "gemini", [30.0] * 10)
+    observe(health, "mistral", [2.0] * 10)
+    policy = FanoutPolicy(health, max_p95=20, max_error_rate=0.5, min_samples=5)
+    assert policy.select(MODELS) == ["mistral"]
+
+
+def test_selection_is_topped_up_with_the_least_bad_models():
+    health = ProviderHealth()
+    observe(health, "mistral", [1.0] * 10, errors=10)
+    observe(health, "gemini", [1.0] * 10, errors=6)
+    observe(health, "llama", [1.0] * 10, errors=9)
+    policy = FanoutPolicy(health, max_error_rate=0.5, min_models=2, min_samples=5)
+    # Urutan asli dipertahankan
+    assert policy.select(MODELS) == ["gemini", "llama"]
+
+
+def test_deadlines():
+    policy = FanoutPolicy(ProviderHealth(), deadlines={"llama": 20}, default_deadline=45)
+    assert policy.deadline("llama") == 20
+    assert policy.deadline("gemini") == 45
+
+
+def test_canonical_is_first_clean_non_empty_answer():
+    result = FanoutResult(skipped=[])
+    result.record("gemini", "error", "Error: quota", 0.5)
+    result.record("llama", "ok", "   ", 1.0)
+    result.record("mistral", "ok", "Cerah berawan", 2.0)
+    assert result.canonical == "mistral"
+    assert result.finish_order == ["gemini", "llama", "mistral"]
+
+    assert FanoutResult(skipped=["llama"]).canonical is None
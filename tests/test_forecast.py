@@ -0,0 +1,89 @@
+import copy
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+import forecast as forecast_module
+from forecast import Forecast, comparison_table
+from weather_service import MalformedWeatherData, WeatherService
+
+DATA = json.loads((Path(__file__).parent.parent / "benchmarks" / "data" / "forecast_jakarta.json").read_text())
+
+
+@pytest.fixture
+def forecast():
+    return Forecast.from_json(DATA)
+
+
+def test_parses_every_slot_grouped_by_day(forecast):
+    assert forecast.location == "Jakarta, ID"
+    assert len(forecast.slots) == len(DATA["list"])
+    assert sum(len(slots) for slots in forecast.by_date.values()) == len(forecast.slots)
+    assert forecast.dates == sorted(forecast.by_date)
+
+
+def test_day_summary(forecast):
+    day = forecast.dates[0]
+    slots = forecast.by_date[day]
+    low, high, condition, wind, rain_slots, total = forecast.day_summary(day)
+    assert (low, high) == (min(s.temp for s in slots), max(s.temp for s in slots))
+    assert condition in {s.condition for s in slots}
+    assert wind == max(s.wind_speed for s in slots)
+    assert rain_slots == sum(1 for s in slots if s.is_rain)
+    assert total == len(slots)
+
+
+def test_prompt_lists_every_day_but_details_only_target_dates(forecast):
+    today, tomorrow = forecast.dates[0], forecast.dates[1]
+    text = forecast.to_prompt([tomorrow], current_date=today)
+    for day in forecast.dates:
+        assert f"- {day.isoformat()}" in text
+    assert f"\n{tomorrow.isoformat()} (Besok):" in text
+    assert f"\n{today.isoformat()} (Hari ini):" not in text
+    # Tanpa tanggal target hanya hari pertama yang dirinci
+    assert f"\n{today.isoformat()} (Hari ini):" in forecast.to_prompt(current_date=today)
+
+
+def test_text_views_are_memoized_and_bounded(forecast, monkeypatch):
+    today = forecast.dates[0]
+    text = forecast.to_text(current_date=today)
+    assert text.startswith("Data Cuaca untuk Jakarta, ID:")
+    assert forecast.to_text(current_date=today) is text
+
+    monkeypatch.setattr(forecast_module, "MAX_VIEWS", 2)
+    for day in forecast.dates:
+        forecast.to_prompt([day], current_date=today)
+    assert len(forecast._views) == 2
+
+
+def test_snapshot_id_is_stable_and_tracks_content():
+    assert Forecast.from_json(DATA).snapshot_id == Forecast.from_json(copy.deepcopy(DATA)).snapshot_id
+    changed = copy.deepcopy(DATA)
+    changed["list"][0]["main"]["temp"] += 1
+    assert Forecast.from_json(changed).snapshot_id != Forecast.from_json(DATA).snapshot_id
+    assert len(Forecast.from_json(DATA).snapshot_id) == 40
+
+
+def test_parse_forecast_rejects_malformed_data():
+    assert WeatherService.parse_forecast(None) is None
+    assert WeatherService.parse_forecast(DATA).city_name == "Jakarta"
+    with pytest.raises(MalformedWeatherData):
+        WeatherService.parse_forecast({"city": {"name": "Jakarta"}, "list": [{"dt": 0}]})
+    with pytest.raises(MalformedWeatherData):
+        WeatherService.parse_forecast({"city": {"name": "Jakarta", "country": "ID"}, "list": []})
+
+
+def test_comparison_table_has_one_row_per_city_per_asked_day(forecast):
+    today, tomorrow = forecast.dates[0], forecast.dates[1]
+    other = Forecast("Bandung", "ID", forecast.by_date[tomorrow])
+    rows = comparison_table([forecast, other], [tomorrow], current_date=today).splitlines()[2:]
+    assert [row.split("|")[:2] for row in rows] == [
+        [f"{tomorrow.isoformat()} (Besok)", "Jakarta, ID"],
+        [f"{tomorrow.isoformat()} (Besok)", "Bandung, ID"],
+    ]
+    assert rows[0].split("|")[5] == "{4}/{5}".format(*forecast.day_summary(tomorrow))
+    # Tanggal yang tidak ada di data: semua tanggal ditampilkan, kota tanpa hari itu dilewati
+    rows = comparison_table([forecast, other], [date(1999, 1, 1)], current_date=today).splitlines()[2:]
+    assert len(rows) == len(forecast.dates) + 1
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from forecast_cache import FORECAST_STEP_SECONDS, ForecastCache, city_cache_key, forecast_expiry
+
+
+def forecast(first_slot):
+    return {"list": [{"dt": first_slot}], "city": {"name": "Jakarta"}}
+
+
+def test_city_key_collapses_spelling_variants():
+    assert city_cache_key("Jakarta") == city_cache_key("  jakarta%20 ")
+    assert city_cache_key("New%20York") == city_cache_key("new   york")
+
+
+def test_expiry_follows_the_next_forecast_slot_within_bounds():
+    now = 1_000_000.0
+    slot = now - 60
+    assert forecast_expiry(forecast(slot), now, 0, 10 ** 6) == slot + FORECAST_STEP_SECONDS
+    assert forecast_expiry(forecast(slot), now, 0, 600) == now + 600
+    assert forecast_expiry(forecast(now - FORECAST_STEP_SECONDS + 1), now, 600, 10 ** 6) == now + 600
+    assert forecast_expiry({}, now, 300, 600) == now + 300
+
+
+def test_entries_expire_and_are_evicted():
+    cache = ForecastCache(max_entries=2, min_ttl=0, max_ttl=0)
+    cache.set("jakarta", forecast(time.time()))
+    assert cache.get("jakarta") is None
+    assert cache.stats()["expirations"] == 1
+
+    cache = ForecastCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, forecast(time.time()))
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_misses_fetch_once():
+    cache = ForecastCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return forecast(time.time())
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch_async("jakarta", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results)
+    stats = cache.stats()
+    assert (stats["upstream_fetches"], stats["coalesced"]) == (1, 4)
+    # Pemanggil berikutnya (loop lain) langsung dari memori
+    assert asyncio.run(cache.get_or_fetch_async("jakarta", fetch)) == results[0]
+    assert len(calls) == 1
+
+
+def test_sqlite_tier_survives_a_new_process_cache(tmp_path):
+    db_path = str(tmp_path / "forecasts.db")
+    value = forecast(time.time())
+    ForecastCache(db_path=db_path).set("jakarta", value)
+
+    cache = ForecastCache(db_path=db_path)
+    assert cache.get("jakarta") == value
+    assert cache.stats()["disk_hits"] == 1
+    cache.clear()
+    assert ForecastCache(db_path=db_path).get("jakarta") is None
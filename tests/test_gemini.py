@@ -0,0 +1,77 @@
+import asyncio
+import gc
+import sys
+import threading
+import types
+
+import pytest
+
+from providers.gemini import GeminiProvider
+from resources import resource_pool
+from runtime import SessionLoop
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Sync GenerativeModel stand-in; records the threads it is called from"""
+
+    threads = []
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_content(self, prompt, stream=False):
+        self.threads.append(threading.get_ident())
+        if prompt == "gagal":
+            raise RuntimeError("upstream error")
+        if stream:
+            return iter([Chunk("Cerah "), Chunk(""), Chunk("berawan")])
+        return Chunk(f"jawaban: {prompt}")
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test")
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key=None: None
+    genai.GenerativeModel = FakeModel
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    FakeModel.threads = []
+    provider = GeminiProvider("gemini", {"name": "gemini-test"})
+    yield provider
+    resource_pool.invalidate("genai")
+    resource_pool.invalidate(provider.resource)
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_calls_work_from_separate_event_loops(provider):
+    # Setiap rerun Streamlit / sesi punya loop sendiri; giliran kedua tidak boleh gagal
+    for _ in range(2):
+        assert asyncio.run(provider.complete("halo")) == "jawaban: halo"
+        assert asyncio.run(collect(provider.stream("cuaca"))) == ["Cerah ", "berawan"]
+    assert threading.get_ident() not in FakeModel.threads
+
+
+def test_stream_errors_reach_the_caller(provider):
+    with pytest.raises(RuntimeError, match="upstream error"):
+        asyncio.run(collect(provider.stream("gagal")))
+
+
+def test_model_handle_outlives_closed_session_loops(provider):
+    first, second = SessionLoop(), SessionLoop()
+    assert first.run(provider.complete("satu")) == "jawaban: satu"
+    del first
+    gc.collect()
+    # Loop sesi pertama sudah ditutup; sesi lain dan loop baru tetap bisa memakai Gemini
+    assert second.run(collect(provider.stream("dua"))) == ["Cerah ", "berawan"]
+    assert asyncio.run(provider.complete("tiga")) == "jawaban: tiga"
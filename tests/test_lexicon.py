@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from lexicon import QueryClassifier, resolve_target_dates
+
+TODAY = date(2026, 10, 17)  # Sabtu
+
+
+@pytest.fixture
+def classifier():
+    return QueryClassifier(min_confidence=0.9)
+
+
+def test_weather_question_with_city_is_answered_locally(classifier):
+    route = classifier.classify("Bagaimana cuaca di Jakarta besok?")
+    assert route["is_weather"]
+    assert route["cities"] == ["jakarta"]
+
+
+def test_several_cities_and_multi_word_names(classifier):
+    route = classifier.classify("Bandingkan cuaca Jakarta dan Banda Aceh")
+    assert route["cities"] == ["jakarta", "banda%20aceh"]
+
+
+@pytest.mark.parametrize("prompt", ["Halo!", "terima kasih", "halo kak", "Selamat pagi min"])
+def test_small_talk(classifier, prompt):
+    route = classifier.classify(prompt)
+    assert route is not None
+    assert not route["is_weather"]
+
+
+@pytest.mark.parametrize("prompt", ["ya", "Yes", "oke", "baik", "sip", "min?", "Ya, kak"])
+def test_confirmations_are_left_to_the_router(classifier, prompt):
+    # Bisa jadi jawaban atas tawaran model di giliran sebelumnya
+    assert classifier.classify(prompt) is None
+
+
+@pytest.mark.parametrize("prompt", [
+    "Bagaimana cuaca disana?",
+    "besok hujan?",
+    "Jakarta itu ibukota mana?",
+    "Jelaskan teori relativitas",
+    "",
+])
+def test_uncertain_prompts_defer_to_the_router(classifier, prompt):
+    assert classifier.classify(prompt) is None
+
+
+def test_context_dependence(classifier):
+    assert classifier.is_context_dependent("cuaca di kota itu?")
+    assert classifier.is_context_dependent("besok hujan?")
+    assert classifier.is_context_dependent("Bandingkan dengan Surabaya")
+    assert not classifier.is_context_dependent("cuaca Jakarta besok")
+    assert not classifier.is_context_dependent("ceritakan lelucon")
+
+
+def test_guess_reuses_previous_cities_only_for_follow_ups(classifier):
+    assert classifier.guess("besok hujan?", ["bandung"])["cities"] == ["bandung"]
+    assert classifier.guess("ceritakan lelucon", ["bandung"]) == {
+        "is_weather": False, "cities": [], "target_date": None
+    }
+
+
+def test_stats_count_hits_and_miss_reasons(classifier):
+    classifier.classify("cuaca jakarta")
+    classifier.classify("disana?")
+    stats = classifier.stats()
+    assert stats["calls"] == 2
+    assert stats["weather_hits"] == 1
+    assert stats["misses"] == {"anaphora": 1}
+
+
+def test_resolve_target_dates():
+    assert resolve_target_dates("cuaca besok", TODAY) == [date(2026, 10, 18)]
+    assert resolve_target_dates("hari ini dan lusa", TODAY) == [TODAY, date(2026, 10, 19)]
+    assert resolve_target_dates("2 hari ke depan", TODAY) == [TODAY, date(2026, 10, 18), date(2026, 10, 19)]
+    assert resolve_target_dates("hari senin", TODAY) == [date(2026, 10, 19)]
+    assert resolve_target_dates("apa kabar", TODAY) == []
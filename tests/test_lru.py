@@ -0,0 +1,43 @@
+import time
+
+from lru import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_count_as_misses():
+    cache = LRUCache(max_entries=4)
+    cache.set("a", 1, expires_at=time.time() - 1)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_weight_bound_and_replacement():
+    cache = LRUCache(max_entries=10, max_weight=5, weigh=len)
+    cache.set("a", "123")
+    cache.set("a", "12")
+    assert cache.weight == 2
+    cache.set("b", "1234")
+    assert cache.get("a") is None
+    assert cache.weight == 4
+
+
+def test_unrecorded_lookups_and_extra_counters():
+    cache = LRUCache(max_entries=2, counters=("bypassed",))
+    cache.set("a", 1)
+    assert cache.get("a", record=False) == 1
+    assert cache.get("b", record=False) is None
+    cache.count("bypassed")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bypassed"]) == (0, 0, 1)
+    assert stats["hit_rate"] == 0.0
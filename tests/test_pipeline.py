@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import pipeline
+from fanout import FanoutResult
+from pipeline import ChatPipeline
+from router import route_cache
+from sessions import Session
+from weather_service import WeatherService
+
+FORECAST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data", "forecast_jakarta.json")
+
+
+class FakeModelManager:
+    """Records what would be sent to the models and answers every stream with a fixed text"""
+
+    def __init__(self, router_answer=None):
+        self.router_answer = router_answer
+        self.calls = []
+
+    async def get_single_response(self, model_type, prompt):
+        return self.router_answer
+
+    async def fan_out(self, model_types, prompt, weather_data=None, on_chunk=None, on_done=None,
+                      cache_key=None, cache_expires_at=None):
+        self.calls.append({"prompt": prompt, "cache_key": cache_key})
+        result = FanoutResult([])
+        for model_type in model_types:
+            on_chunk(model_type, "jawaban")
+            result.record(model_type, "ok", "jawaban", 0.0)
+            on_done(model_type, "ok")
+        return result
+
+
+class FakeWeatherService(WeatherService):
+    unreadable = ()
+
+    @classmethod
+    async def get_weather_data_async(cls, city):
+        if city in cls.unreadable:
+            return {"city": {}, "list": [{}]}
+        with open(FORECAST) as f:
+            return json.load(f)
+
+
+@pytest.fixture(autouse=True)
+def no_prefetch(monkeypatch):
+    monkeypatch.setattr(pipeline, "SPECULATIVE_PREFETCH", False)
+    monkeypatch.setattr(FakeWeatherService, "unreadable", ())
+    route_cache.clear()
+
+
+def run_turn(manager, session, prompt):
+    async def run():
+        return [event async for event in ChatPipeline(manager, FakeWeatherService, ["gemini"]).run_turn(session, prompt)]
+    return asyncio.run(run())
+
+
+def session_with_history(text):
+    session = Session("s")
+    session.context.add("user", text)
+    session.context.add("assistant", "Baik, saya ingat.")
+    return session
+
+
+def test_standalone_answers_are_cached_without_any_conversation():
+    manager = FakeModelManager()
+    run_turn(manager, session_with_history("Nama saya Budi"), "Cuaca Jakarta besok")
+    run_turn(manager, session_with_history("Saya suka kopi"), "Cuaca Jakarta besok")
+    first, second = manager.calls
+    # Jawaban yang di-cache lintas sesi tidak boleh bisa memuat riwayat sesi lain
+    assert "Budi" not in first["prompt"]
+    assert first["prompt"] == second["prompt"]
+    assert first["cache_key"] == second["cache_key"]
+
+
+def test_follow_ups_keep_the_conversation_in_prompt_and_key():
+    manager = FakeModelManager('{"is_weather": true, "cities": ["jakarta"], "target_date": null}')
+    run_turn(manager, session_with_history("Cuaca Jakarta hari ini?"), "Besok hujan tidak?")
+    run_turn(manager, session_with_history("Bagaimana cuaca Jakarta?"), "Besok hujan tidak?")
+    first, second = manager.calls
+    assert "Cuaca Jakarta hari ini?" in first["prompt"]
+    assert first["cache_key"] != second["cache_key"]
+
+
+def test_empty_prefetch_result_is_not_fetched_again(monkeypatch):
+    fetched = []
+
+    async def not_found(city):
+        fetched.append(city)
+        return None
+
+    monkeypatch.setattr(pipeline, "SPECULATIVE_PREFETCH", True)
+    monkeypatch.setattr(WeatherService, "get_weather_data_async", staticmethod(not_found))
+
+    async def run():
+        turn = ChatPipeline(FakeModelManager(), WeatherService, ["gemini"]).run_turn(Session("s"), "Cuaca Jakarta besok")
+        return [event async for event in turn]
+
+    events = asyncio.run(run())
+    assert events[-1]["type"] == "error"
+    assert fetched == ["jakarta"]
+
+
+def test_several_cities_are_compared_in_one_prompt(monkeypatch):
+    monkeypatch.setattr(pipeline, "WEATHER_MAX_CITIES", 3)
+    monkeypatch.setattr(FakeWeatherService, "unreadable", ("bandung",))
+    manager = FakeModelManager(
+        '{"is_weather": true, "cities": ["jakarta", "surabaya", "bandung", "medan"], "target_date": null}'
+    )
+    events = run_turn(manager, Session("s"), "Bandingkan cuaca Jakarta, Surabaya, Bandung dan Medan")
+    notices = [event["message"] for event in events if event["type"] == "notice"]
+    assert notices == [
+        "Maksimal 3 kota per pertanyaan; medan dilewati.",
+        "Data cuaca untuk bandung tidak dapat dibaca dan dilewati.",
+    ]
+    assert [event["city"] for event in events if event["type"] == "forecast"] == ["jakarta", "surabaya"]
+    prompt = manager.calls[0]["prompt"]
+    assert "Perbandingan cuaca per kota" in prompt
+    assert "Data cuaca tidak valid untuk: bandung" in prompt
+    assert "Data cuaca tidak tersedia untuk: medan" in prompt
+
+
+def test_weather_info_lists_missing_and_malformed_cities():
+    forecast = WeatherService.parse_forecast(json.load(open(FORECAST)))
+    assert ChatPipeline._weather_info(["jakarta"], {}, ()) == ""
+    single = ChatPipeline._weather_info(["jakarta", "new%20york"], {"jakarta": forecast}, ())
+    assert single.startswith("Data Cuaca untuk Jakarta, ID")
+    assert single.endswith("\nData cuaca tidak tersedia untuk: new york")
+    several = ChatPipeline._weather_info(
+        ["jakarta", "depok", "bogor"], {"jakarta": forecast, "depok": forecast}, (), {"bogor": "KeyError"}
+    )
+    assert several.startswith("Perbandingan cuaca per kota")
+    assert several.endswith("\nData cuaca tidak valid untuk: bogor")
+    assert "tidak tersedia" not in several
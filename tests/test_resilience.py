@@ -0,0 +1,175 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, PRIORITY_ROUTER, PRIORITY_STREAM, Upstream, UpstreamUnavailable, is_failure
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.headers = headers or {}
+
+
+def test_burst_is_admitted_then_long_waits_are_rejected_on_entry():
+    upstream = Upstream("test", rpm=60, burst=2, max_wait=0.5)
+
+    async def run():
+        await upstream.acquire()
+        await upstream.acquire()
+        start = time.monotonic()
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            await upstream.acquire()
+        return excinfo.value, time.monotonic() - start
+
+    error, elapsed = asyncio.run(run())
+    assert error.reason == "throttled"
+    # Perkiraan tunggu (1 detik) sudah melebihi max_wait: ditolak tanpa menunggu dulu
+    assert elapsed < 0.1
+    assert upstream.stats()["rejected"] == 1
+
+
+def test_waiter_is_rejected_when_its_queue_position_exceeds_max_wait():
+    upstream = Upstream("test", rpm=60, burst=1, max_wait=1.5)
+
+    async def run():
+        await upstream.acquire()
+        first = asyncio.ensure_future(upstream.acquire())
+        await asyncio.sleep(0.01)
+        with pytest.raises(UpstreamUnavailable):
+            # Di belakang satu waiter: butuh sekitar 2 detik
+            await upstream.acquire()
+        first.cancel()
+
+    asyncio.run(run())
+
+
+def test_higher_priority_waiter_overtakes_queued_ones():
+    upstream = Upstream("test", rpm=600, burst=1, max_wait=5)
+    order = []
+
+    async def call(name, priority):
+        await upstream.acquire(priority)
+        order.append(name)
+
+    async def run():
+        await upstream.acquire()
+        stream = asyncio.ensure_future(call("stream", PRIORITY_STREAM))
+        await asyncio.sleep(0.01)
+        router = asyncio.ensure_future(call("router", PRIORITY_ROUTER))
+        await asyncio.gather(stream, router)
+
+    asyncio.run(run())
+    assert order == ["router", "stream"]
+
+
+def test_unthrottled_upstream_admits_without_waiting():
+    upstream = Upstream("test", rpm=0)
+
+    async def run():
+        for _ in range(50):
+            await upstream.acquire()
+
+    asyncio.run(run())
+    assert upstream.stats()["throttled"] == 0
+
+
+def test_breaker_opens_after_threshold_and_closes_after_successful_probe():
+    upstream = Upstream("test", failure_threshold=2, cooldown=0.05)
+
+    async def run():
+        for _ in range(2):
+            upstream.record(await upstream.acquire(), HTTPError(503))
+        assert upstream.state == OPEN
+        with pytest.raises(UpstreamUnavailable) as excinfo:
+            await upstream.acquire()
+        assert excinfo.value.reason == "open"
+
+        await asyncio.sleep(0.06)
+        probe = await upstream.acquire()
+        assert probe.probe
+        # Selama probe berjalan, panggilan lain tetap ditolak
+        with pytest.raises(UpstreamUnavailable):
+            await upstream.acquire()
+        upstream.record(probe)
+
+    asyncio.run(run())
+    assert upstream.state == CLOSED
+    assert upstream.stats()["trips"] == 1
+
+
+def test_failed_probe_reopens_the_breaker():
+    upstream = Upstream("test", failure_threshold=1, cooldown=0.05)
+
+    async def run():
+        upstream.record(await upstream.acquire(), HTTPError(500))
+        await asyncio.sleep(0.06)
+        upstream.record(await upstream.acquire(), TimeoutError())
+
+    asyncio.run(run())
+    assert upstream.state == OPEN
+    assert upstream.stats()["trips"] == 2
+
+
+def test_stale_call_cannot_reset_the_breaker():
+    upstream = Upstream("test", failure_threshold=1, cooldown=0.05)
+
+    async def run():
+        stale = await upstream.acquire()
+        upstream.record(await upstream.acquire(), HTTPError(502))
+        await asyncio.sleep(0.06)
+        probe = await upstream.acquire()
+        # Diizinkan sebelum trip; sukses yang terlambat tidak boleh menutup breaker
+        upstream.record(stale)
+        assert upstream.state == HALF_OPEN
+        upstream.record(probe)
+
+    asyncio.run(run())
+    assert upstream.state == CLOSED
+
+
+def test_429_trips_at_once_for_at_least_retry_after():
+    upstream = Upstream("test", rpm=60, burst=3, failure_threshold=5, cooldown=0.01)
+
+    async def run():
+        upstream.record(await upstream.acquire(), HTTPError(429, {"retry-after": "30"}))
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert upstream.state == OPEN
+    assert upstream.stats()["tokens"] < 1
+
+
+def test_client_errors_do_not_count_as_failures():
+    assert not is_failure(HTTPError(404))
+    assert not is_failure(HTTPError(400))
+    assert is_failure(HTTPError(500))
+    assert is_failure(HTTPError(429))
+    assert is_failure(ConnectionError())
+
+    upstream = Upstream("test", failure_threshold=1)
+
+    async def run():
+        upstream.record(await upstream.acquire(), HTTPError(404))
+
+    asyncio.run(run())
+    assert upstream.state == CLOSED
+
+
+def test_cancelled_probe_frees_the_probe_slot():
+    upstream = Upstream("test", failure_threshold=1, cooldown=0.05)
+
+    async def run():
+        upstream.record(await upstream.acquire(), HTTPError(500))
+        await asyncio.sleep(0.06)
+        with pytest.raises(asyncio.CancelledError):
+            async with upstream.call():
+                raise asyncio.CancelledError()
+        probe = await upstream.acquire()
+        assert probe.probe
+
+    asyncio.run(run())
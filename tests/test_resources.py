@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from resources import ResourcePool
+
+
+class Client:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_shared_resources_are_built_once_and_rebuilt_when_unhealthy():
+    pool = ResourcePool()
+    first = pool.get("sdk", object)
+    assert pool.get("sdk", object) is first
+    assert pool.get("sdk", object, health_check=lambda resource: False) is not first
+    stats = pool.stats()
+    assert (stats["builds"], stats["rebuilds"], stats["hits"]) == (1, 1, 1)
+
+
+def test_loop_bound_resources_are_kept_per_loop():
+    pool = ResourcePool()
+
+    async def get():
+        return pool.get("http", Client, loop_bound=True, close=Client.aclose)
+
+    async def twice():
+        return await get(), await get()
+
+    a, b = asyncio.run(twice())
+    assert a is b
+    assert asyncio.run(get()) is not a
+
+
+def test_invalidate_closes_only_the_running_loops_client():
+    pool = ResourcePool()
+
+    async def get():
+        return pool.get("http", Client, loop_bound=True, close=Client.aclose)
+
+    async def invalidate_own():
+        own = await get()
+        pool.invalidate("http")
+        await asyncio.sleep(0)  # beri kesempatan closer async berjalan
+        return own, await get()
+
+    other_loop = asyncio.new_event_loop()
+    try:
+        other = other_loop.run_until_complete(get())
+        own, rebuilt = asyncio.run(invalidate_own())
+        assert own.closed
+        assert rebuilt is not own
+        # Klien sesi lain tidak ikut dibuang atau ditutup
+        assert not other.closed
+        assert other_loop.run_until_complete(get()) is other
+    finally:
+        other_loop.close()
+
+
+def test_factory_runs_outside_the_pool_lock():
+    pool = ResourcePool()
+    started = threading.Event()
+
+    def slow_factory():
+        started.set()
+        time.sleep(0.3)
+        return object()
+
+    thread = threading.Thread(target=pool.get, args=("slow", slow_factory))
+    thread.start()
+    started.wait()
+    start = time.monotonic()
+    pool.get("fast", object)
+    assert time.monotonic() - start < 0.1
+    thread.join()
+
+
+def test_close_loop_closes_that_loops_clients():
+    pool = ResourcePool()
+
+    async def run():
+        client = pool.get("http", Client, loop_bound=True, close=Client.aclose)
+        assert await pool.close_loop() == 1
+        return client
+
+    assert asyncio.run(run()).closed
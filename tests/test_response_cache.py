@@ -0,0 +1,60 @@
+import time
+
+from response_cache import ResponseCache, make_prompt_key
+
+
+def test_prompt_key_is_normalized_and_ignores_missing_inputs():
+    key = make_prompt_key(template="weather", prompt="Cuaca  Jakarta?", forecast="abc")
+    assert key == make_prompt_key(forecast="abc", prompt="cuaca jakarta?", template="WEATHER")
+    assert key == make_prompt_key(template="weather", prompt="cuaca jakarta?", forecast="abc", context=None)
+    assert key != make_prompt_key(template="weather", prompt="cuaca jakarta?", forecast="abc", context="Human: halo")
+    # Prakiraan baru berarti jawaban baru
+    assert key != make_prompt_key(template="weather", prompt="cuaca jakarta?", forecast="def")
+
+
+def test_answers_are_cached_per_model():
+    cache = ResponseCache()
+    cache.set("gemini", "k", "Cerah")
+    assert cache.get("gemini", "k") == "Cerah"
+    assert cache.get("mistral", "k") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_answers_are_dropped():
+    cache = ResponseCache()
+    cache.set("gemini", "k", "Cerah", expires_at=time.time() - 1)
+    assert cache.get("gemini", "k") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_bounded_by_entries_and_characters():
+    cache = ResponseCache(max_entries=2, max_chars=10)
+    cache.set("m", "a", "1234")
+    cache.set("m", "b", "1234")
+    cache.set("m", "c", "1234")
+    assert cache.get("m", "a") is None
+    cache.set("m", "d", "123456")
+    stats = cache.stats()
+    assert stats["chars"] == 10
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "c") == "1234"
+    # Jawaban yang sendirian sudah melebihi batas tidak disimpan
+    cache.set("m", "e", "x" * 11)
+    assert cache.get("m", "e") is None
+
+
+def test_overwrite_keeps_char_count_consistent():
+    cache = ResponseCache()
+    cache.set("m", "k", "panjang sekali")
+    cache.set("m", "k", "pendek")
+    assert cache.stats()["chars"] == len("pendek")
+
+
+def test_disabled_and_bypassed_models_are_inactive():
+    assert not ResponseCache(enabled=False).is_active("gemini")
+    cache = ResponseCache(bypass=["llama"])
+    assert not cache.is_active("llama")
+    assert cache.is_active("gemini")
+    assert cache.stats()["bypassed"] == 1
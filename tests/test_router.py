@@ -0,0 +1,91 @@
+from datetime import date
+
+from router import RouteCache, depends_on_context, normalize_cities, parse_route_response
+
+TODAY = date(2026, 10, 17)
+
+
+def route(*cities, is_weather=True):
+    return {"is_weather": is_weather, "cities": list(cities), "target_date": None}
+
+
+def test_parse_route_response_accepts_fenced_json_and_normalizes_cities():
+    text = '```json\n{"is_weather": true, "cities": ["Jakarta", "Kota Bandung", "jakarta"], "target_date": "2026-10-18"}\n```'
+    assert parse_route_response(text) == {
+        "is_weather": True,
+        "cities": ["jakarta", "kota%20bandung"],
+        "target_date": date(2026, 10, 18),
+    }
+
+
+def test_parse_route_response_rejects_schema_violations():
+    assert parse_route_response("") is None
+    assert parse_route_response("bukan json") is None
+    assert parse_route_response('{"is_weather": true, "cities": []}') is None
+    assert parse_route_response('{"is_weather": "ya", "cities": [], "target_date": null}') is None
+    assert parse_route_response('{"is_weather": true, "cities": [1], "target_date": null}') is None
+    assert parse_route_response('{"is_weather": true, "cities": [], "target_date": "besok"}') is None
+
+
+def test_normalize_cities_drops_unknown_and_duplicates():
+    assert normalize_cities(["Jakarta", "lokasi tidak diketahui", "", "JAKARTA", "Banda  Aceh"]) == [
+        "jakarta", "banda%20aceh"
+    ]
+
+
+def test_depends_on_context():
+    assert not depends_on_context("Cuaca Jakarta besok", route("jakarta"))
+    assert depends_on_context("Bagaimana cuaca disana?", route("jakarta"))
+    assert depends_on_context("Kalau besok?", route("jakarta"))
+    # Lanjutan perbandingan: kota sebelumnya ikut di rute tapi tidak disebut di prompt
+    assert depends_on_context("Kalau Bandung?", route("jakarta", "bandung"))
+
+
+def test_key_normalizes_prompt_and_covers_date_and_context():
+    assert RouteCache.key("Cuaca  JAKARTA", today=TODAY) == RouteCache.key("cuaca jakarta", today=TODAY)
+    assert RouteCache.key("cuaca jakarta", today=TODAY) != RouteCache.key("cuaca jakarta", today=date(2026, 10, 18))
+    assert RouteCache.key("kalau besok?", "Human: cuaca bandung", TODAY) != RouteCache.key("kalau besok?", today=TODAY)
+
+
+def test_context_free_route_is_shared_across_conversations():
+    cache = RouteCache()
+    cache.set("Cuaca Jakarta besok", "Human: halo", route("jakarta"))
+    assert cache.get("cuaca jakarta besok", "Human: sesi lain") == route("jakarta")
+
+
+def test_follow_up_route_is_only_replayed_under_the_same_context():
+    cache = RouteCache()
+    cache.set("Kalau besok?", "Human: cuaca bandung", route("bandung"))
+    assert cache.get("Kalau besok?", "Human: cuaca medan") is None
+    assert cache.get("Kalau besok?", "Human: cuaca bandung") == route("bandung")
+
+
+def test_cached_routes_are_copies():
+    cache = RouteCache()
+    cache.set("cuaca jakarta", "", route("jakarta"))
+    cache.get("cuaca jakarta")["cities"].append("bandung")
+    assert cache.get("cuaca jakarta")["cities"] == ["jakarta"]
+
+
+def test_lru_eviction_and_invalidate():
+    cache = RouteCache(max_entries=2)
+    cache.set("cuaca jakarta", "", route("jakarta"))
+    cache.set("cuaca bandung", "", route("bandung"))
+    cache.get("cuaca jakarta")
+    cache.set("cuaca medan", "", route("medan"))
+    assert cache.get("cuaca bandung") is None
+    assert cache.get("cuaca jakarta") is not None
+
+    assert cache.invalidate("cuaca jakarta")
+    assert not cache.invalidate("cuaca jakarta")
+    assert cache.get("cuaca jakarta") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["invalidations"] == 1
+
+
+def test_router_prompt_example_uses_a_parseable_date():
+    from config import QUERY_ROUTER_PROMPT
+    prompt = QUERY_ROUTER_PROMPT.format(context="", prompt="cuaca besok", today="2026-10-17", tomorrow="2026-10-18")
+    example = next(line for line in prompt.splitlines() if "Yogyakarta besok" in line)
+    assert parse_route_response(example.split("→", 1)[1])["target_date"] == date(2026, 10, 18)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import server
+
+
+class FakePipeline:
+    """Streams a fixed turn and stores it like ChatPipeline does"""
+
+    async def run_turn(self, session, user_input, use_weather_api=True):
+        yield {"type": "start", "models": ["gemini"]}
+        yield {"type": "chunk", "model": "gemini", "text": "Cerah"}
+        session.store_turn(user_input, {"gemini": "Cerah"})
+        yield {"type": "done"}
+
+
+@pytest.fixture(autouse=True)
+def no_clients(monkeypatch):
+    monkeypatch.setattr(server.model_manager, "initialize_clients", lambda: None)
+
+
+def run(scenario):
+    async def main():
+        app = server.create_app()
+        app["pipeline"] = FakePipeline()
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(app, client)
+    return asyncio.run(main())
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_turn_streams_events_and_is_kept_in_history():
+    async def scenario(app, client):
+        response = await client.post("/sessions")
+        assert response.status == 201
+        session_id = (await response.json())["session_id"]
+
+        response = await client.post(f"/sessions/{session_id}/turns", json={"message": "Cuaca Jakarta?"})
+        assert response.headers["Content-Type"] == "text/event-stream"
+        events = parse_sse(await response.text())
+        assert [name for name, _ in events] == ["start", "chunk", "done"]
+        assert events[1][1] == {"type": "chunk", "model": "gemini", "text": "Cerah"}
+
+        history = (await (await client.get(f"/sessions/{session_id}")).json())["history"]
+        assert [(chat["user_input"], chat["responses"]) for chat in history] == [("Cuaca Jakarta?", {"gemini": "Cerah"})]
+        assert not app["sessions"].get(session_id).busy
+
+        assert (await client.delete(f"/sessions/{session_id}")).status == 204
+        assert (await client.get(f"/sessions/{session_id}")).status == 404
+
+    run(scenario)
+
+
+def test_busy_session_and_bad_requests_are_rejected():
+    async def scenario(app, client):
+        session_id = (await (await client.post("/sessions")).json())["session_id"]
+        url = f"/sessions/{session_id}/turns"
+        assert (await client.post("/sessions/unknown/turns", json={"message": "halo"})).status == 404
+        assert (await client.post(url, data="bukan json")).status == 400
+        assert (await client.post(url, json={"message": " "})).status == 400
+        assert (await client.post(url, json={"message": "x" * (server.MAX_MESSAGE_CHARS + 1)})).status == 400
+
+        app["sessions"].get(session_id).busy = True
+        response = await client.post(url, json={"message": "halo"})
+        assert response.status == 409
+        assert "already running" in (await response.json())["error"]
+
+    run(scenario)
+
+
+def test_health_and_metrics():
+    async def scenario(app, client):
+        assert await (await client.get("/healthz")).json() == {"status": "ok"}
+        assert (await client.get("/metrics")).status == 200
+
+    run(scenario)
@@ -0,0 +1,35 @@
+import json
+from pathlib import Path
+
+import sessions
+from forecast import Forecast
+from sessions import Session
+
+DATA = json.loads((Path(__file__).parent.parent / "benchmarks" / "data" / "forecast_jakarta.json").read_text())
+
+
+def test_cap_drops_oldest_turns_but_keeps_the_latest(monkeypatch):
+    monkeypatch.setattr(sessions, "SESSION_MEMORY_MAX_CHARS", 100)
+    session = Session()
+    for i in range(5):
+        session.store_turn(f"q{i}", {"gemini": "x" * 40})
+    assert [chat["user_input"] for chat in session.chat_history] == ["q3", "q4"]
+
+    session.store_turn("besar", {"gemini": "x" * 500})
+    assert [chat["user_input"] for chat in session.chat_history] == ["besar"]
+
+
+def test_forecasts_are_stored_once_and_dropped_with_their_last_turn(monkeypatch):
+    forecast = Forecast.from_json(DATA)
+    size = len(forecast.to_text())
+    monkeypatch.setattr(sessions, "SESSION_MEMORY_MAX_CHARS", size + 100)
+    session = Session()
+    session.store_turn("cuaca jakarta?", {"gemini": "cerah"}, [forecast])
+    session.store_turn("besok?", {"gemini": "hujan"}, [forecast])
+    # Dua giliran merujuk satu snapshot: teksnya dihitung sekali
+    assert len(session.chat_history) == 2
+    assert list(session.forecasts) == [forecast.snapshot_id]
+
+    session.store_turn("halo", {"gemini": "x" * 100})
+    assert [chat["user_input"] for chat in session.chat_history] == ["halo"]
+    assert session.forecasts == {}
@@ -1,5 +1,35 @@
+import io
+import time
 import streamlit as st
-from config import PAGE_CONFIG, MODELS
+from config import PAGE_CONFIG, MODELS, RENDER_INTERVAL_MS, RENDER_MIN_CHARS, HISTORY_FULL_TURNS
+
+
+class StreamRenderer:
+    """Buffer streamed chunks and re-render the placeholder only on a time or size budget"""
+
+    def __init__(self, container, interval_ms=RENDER_INTERVAL_MS, min_chars=RENDER_MIN_CHARS):
+        self.container = container
+        self.interval = interval_ms / 1000
+        self.min_chars = min_chars
+        self._buffer = io.StringIO()
+        self._pending = 0
+        self._last_flush = 0.0
+
+    def append(self, chunk):
+        self._buffer.write(chunk)
+        self._pending += len(chunk)
+        if self._pending >= self.min_chars or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.container.markdown(self.text)
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def text(self):
+        return self._buffer.getvalue()
 
 class UI:
     @staticmethod
@@ -14,14 +44,14 @@ class UI:
                 max-height: 400px;
                 overflow-y: auto;
             }
+            /* Satu layout untuk kedua orientasi: kolom respons ditumpuk saat portrait */
             @media (orientation: portrait) {
-                .stColumn, .stColumns, .stHorizontalBlock {
-                    display: none;
+                .stHorizontalBlock {
+                    flex-direction: column;
                 }
-            }
-            @media (orientation: landscape) {
-                .stTabs {
-                    display: none;
+                .stColumn {
+                    width: 100% !important;
+                    flex: 1 1 100% !important;
                 }
             }
             </style>
@@ -44,7 +74,9 @@ class UI:
                 help="Matikan untuk melihat respons model tanpa data cuaca real-time"
             )
             
-            st.markdown("""
+            # Daftar model mengikuti ENABLED_MODELS, jadi menambah/mematikan model tidak perlu mengubah file ini
+            model_list = "\n".join(f"            - {settings['display_name']}" for settings in MODELS.values())
+            st.markdown(f"""
             ### Tentang Asisten Cuaca
             Asisten ini dapat memberikan informasi cuaca dan bercakap-cakap umum dengan fitur:
            
@@ -54,10 +86,8 @@ class UI:
            
             🌍  Menggunakan bahasa Indonesia
            
-            🤖  Analisis dari 3 model AI berbeda:
-            - Mistral Large (via Mistral)
-            - Gemini 1.5 Flash (via Google AI)
-            - Llama 3.2 90B (via Groq)
+            🤖  Analisis dari {len(MODELS)} model AI berbeda:
+{model_list}
            
             💬  Dapat melakukan percakapan umum
            
@@ -65,58 +95,63 @@ class UI:
             - "Bagaimana cuaca di Jakarta hari ini?"
             - "Prakiraan cuaca Yogyakarta besok"
             - "Cuaca Surabaya 3 hari ke depan"
+            - "Bandingkan cuaca Jakarta dan Bandung besok"
             """)
 
     @staticmethod
-    def display_weather_data(weather_data):
+    def display_weather_data(weather_data, location=None):
         """Display weather data in an expander"""
-        with st.expander("Data Cuaca Lengkap"):
+        with st.expander(f"Data Cuaca Lengkap: {location}" if location else "Data Cuaca Lengkap"):
             st.code(weather_data)
 
     @staticmethod
     def display_responses(responses):
-        """Display model responses in both column and tab format"""
-        # Column layout for landscape
-        cols = st.columns(3)
+        """Display model responses in columns (stacked in portrait by the CSS in setup)"""
+        cols = st.columns(len(responses))
         for i, (model_type, response) in enumerate(responses.items()):
             with cols[i]:
                 with st.container(border=True):
                     st.subheader(MODELS[model_type]["display_name"])
                     st.markdown(response)
-        
-        # Tab layout for portrait
-        tabs = st.tabs([MODELS[model]["display_name"] for model in responses.keys()])
-        for tab, (model_type, response) in zip(tabs, responses.items()):
-            with tab:
-                st.markdown(response)
 
     @staticmethod
-    def display_chat_history(chat_history):
-        """Display full chat history"""
-        for chat in chat_history:
-            st.chat_message("user").write(chat["user_input"])
-            
-            if "weather_data" in chat:
-                UI.display_weather_data(chat["weather_data"])
-            
-            UI.display_responses(chat["responses"])
+    def display_chat_history(chat_history, forecasts):
+        """Display the last HISTORY_FULL_TURNS turns fully and older turns as collapsed summaries"""
+        cutoff = len(chat_history) - HISTORY_FULL_TURNS
+        for i, chat in enumerate(chat_history):
+            if i < cutoff:
+                UI.display_collapsed_turn(chat, forecasts)
+            else:
+                UI.display_turn(chat, forecasts)
+
+    @staticmethod
+    def display_turn(chat, forecasts):
+        st.chat_message("user").write(chat["user_input"])
+
+        for key in chat.get("forecast_keys", ()):
+            forecast = forecasts.get(key)
+            if forecast:
+                UI.display_weather_data(forecast.to_text(chat["date"]), forecast.location)
+
+        UI.display_responses(chat["responses"])
+
+    @staticmethod
+    def display_collapsed_turn(chat, forecasts):
+        """One-line summary; the full turn is only rendered after the user expands it"""
+        summary = chat["user_input"] if len(chat["user_input"]) <= 80 else chat["user_input"][:77] + "..."
+        if st.toggle(f"💬 {summary}", key=f"history_turn_{chat['id']}"):
+            UI.display_turn(chat, forecasts)
 
     @staticmethod
     def create_response_containers():
-        """Create and return containers for streaming responses"""
-        cols = st.columns(3)
-        response_containers = {}
-        
+        """Create one throttled renderer per model for streaming responses"""
+        cols = st.columns(len(MODELS))
+        renderers = {}
+
         for i, model_type in enumerate(MODELS.keys()):
             with cols[i]:
                 with st.container(border=True):
                     st.subheader(MODELS[model_type]["display_name"])
-                    response_containers[model_type] = st.empty()
-        
-        tabs = st.tabs([MODELS[model]["display_name"] for model in MODELS])
-        tab_containers = {}
-        for model_type, tab in zip(MODELS.keys(), tabs):
-            with tab:
-                tab_containers[model_type] = st.empty()
-                
-        return response_containers, tab_containers
\ No newline at end of file
+                    renderers[model_type] = StreamRenderer(st.empty())
+
+        return renderers
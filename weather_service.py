@@ -1,70 +1,127 @@
-import requests
-import streamlit as st
-from datetime import datetime
-from config import WEATHER_API_URL
+import asyncio
+import random
+import threading
+import aiohttp
+from urllib.parse import quote
+from config import get_secret, WEATHER_API_URL, WEATHER_API_TIMEOUT, WEATHER_API_RETRIES, WEATHER_API_BACKOFF, WEATHER_API_MAX_CONCURRENCY
+from forecast_cache import forecast_cache, city_cache_key
+from forecast import Forecast
+from resilience import PRIORITY_FETCH, UpstreamUnavailable, upstreams
+from resources import resource_pool
+
+class MalformedWeatherData(ValueError):
+    """The API answered, but the forecast JSON does not have the expected shape"""
+
+
+# Status yang layak dicoba ulang; 4xx lain (mis. 404 kota tidak ditemukan) langsung gagal
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _build_http_pool():
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=WEATHER_API_MAX_CONCURRENCY, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(total=WEATHER_API_TIMEOUT)
+    )
+    return session, asyncio.Semaphore(WEATHER_API_MAX_CONCURRENCY)
+
+
+def _get_http_pool():
+    """Return the keep-alive session and concurrency limiter for the running event loop"""
+    # Fetch dari cache berjalan di background loop, jadi praktis satu pool per proses
+    return resource_pool.get(
+        "openweather_http",
+        _build_http_pool,
+        health_check=lambda pool: not pool[0].closed,
+        loop_bound=True,
+        close=lambda pool: pool[0].close()
+    )
+
+
+class ForecastPrefetch:
+    """Speculative forecast fetch started before routing has confirmed the city"""
+
+    _lock = threading.Lock()
+    _stats = {"started": 0, "used": 0, "wasted": 0}
+
+    def __init__(self, city):
+        self.key = city_cache_key(city)
+        self.task = asyncio.ensure_future(WeatherService.get_weather_data_async(city))
+        ForecastPrefetch._count("started")
+
+    async def resolve(self, city):
+        """Return the prefetched forecast if it is for city, otherwise discard it and return None"""
+        if city and city_cache_key(city) == self.key:
+            ForecastPrefetch._count("used")
+            return await self.task
+        self.discard()
+        return None
+
+    def discard(self):
+        # Fetch ke upstream tetap selesai di background dan mengisi cache, hanya hasilnya yang dibuang
+        if not self.task.done():
+            self.task.cancel()
+        ForecastPrefetch._count("wasted")
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls._stats[name] += 1
+
+    @classmethod
+    def stats(cls):
+        """Started/used/wasted counters and the fraction of speculation that was wasted"""
+        with cls._lock:
+            settled = cls._stats["used"] + cls._stats["wasted"]
+            return {**cls._stats, "waste_rate": cls._stats["wasted"] / settled if settled else 0.0}
+
 
 class WeatherService:
     @staticmethod
-    def get_weather_data(city):
-        """Fetch 5-day weather forecast"""
-        url = f"{WEATHER_API_URL}?q={city}&appid={st.secrets['OPENWEATHER_API_KEY']}&units=metric&lang=id"
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException:
-            return None
-    
+    async def get_weather_data_async(city):
+        """Fetch 5-day weather forecast without blocking the event loop"""
+        key = city_cache_key(city)
+        return await forecast_cache.get_or_fetch_async(key, lambda: WeatherService._fetch_weather_data_async(key))
+
     @staticmethod
-    def format_weather_data(weather_data, prompt):
-        """Format weather data into structured format"""
-        if not weather_data or 'list' not in weather_data:
-            return "Data cuaca tidak tersedia"
-        
-        try:
-            # Mengambil nama kota dan negara dari respons API
-            city_name = weather_data['city']['name']
-            country_code = weather_data['city']['country']
-            query = f"{city_name}, {country_code}"  # Format: "Jakarta, ID"
-            
-            output = f"Data Cuaca untuk {query}:\n\n"
-            
-            current_date = datetime.now().date()
-            forecasts_by_date = {}
-            
-            for forecast in weather_data['list']:
-                forecast_time = datetime.fromtimestamp(forecast['dt'])
-                date_key = forecast_time.date()
-                
-                if date_key not in forecasts_by_date:
-                    forecasts_by_date[date_key] = []
-                forecasts_by_date[date_key].append(forecast)
-            
-            for date in sorted(forecasts_by_date.keys())[:5]:
-                day_forecasts = forecasts_by_date[date]
-                
-                if date == current_date:
-                    output += f"\n📅 Hari ini ({date.strftime('%d %B %Y')})\n"
-                else:
-                    days_ahead = (date - current_date).days
-                    output += f"\n📅 {days_ahead} hari ke depan ({date.strftime('%d %B %Y')})\n"
-                
-                for forecast in day_forecasts:
-                    forecast_time = datetime.fromtimestamp(forecast['dt'])
-                    output += WeatherService._format_forecast(forecast, forecast_time)
-            
-            return output.strip()
-        except Exception as e:
-            return f"Error dalam memformat data cuaca: {str(e)}"
+    def _weather_url(city):
+        return f"{WEATHER_API_URL}?q={quote(city)}&appid={get_secret('OPENWEATHER_API_KEY')}&units=metric&lang=id"
+
+    @staticmethod
+    async def _fetch_weather_data_async(city):
+        """Fetch 5-day weather forecast over the pooled session with timeout and jittered retries"""
+        session, limiter = _get_http_pool()
+        upstream = upstreams.get("openweather")
+        url = WeatherService._weather_url(city)
+        for attempt in range(WEATHER_API_RETRIES + 1):
+            try:
+                # Tiap percobaan memakai satu token; breaker yang terbuka (mis. setelah 429) langsung menolak
+                async with upstream.call(PRIORITY_FETCH):
+                    async with limiter:
+                        async with session.get(url) as response:
+                            response.raise_for_status()
+                            return await response.json()
+            except UpstreamUnavailable:
+                return None
+            except aiohttp.ClientResponseError as e:
+                # Termasuk ContentTypeError (status 200 tapi bukan JSON)
+                if e.status not in RETRYABLE_STATUS:
+                    return None
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            if attempt < WEATHER_API_RETRIES:
+                # Full jitter supaya sesi-sesi yang gagal bersamaan tidak retry serentak
+                await asyncio.sleep(random.uniform(0, WEATHER_API_BACKOFF * 2 ** attempt))
+        return None
     
     @staticmethod
-    def _format_forecast(forecast, forecast_time):
-        return f"""
-⏰ Pukul {forecast_time.strftime('%H:%M')}
-🌡️ Suhu: {forecast['main']['temp']}°C
-🌡️ Terasa seperti: {forecast['main']['feels_like']}°C
-💧 Kelembaban: {forecast['main']['humidity']}%
-💨 Kecepatan Angin: {forecast['wind']['speed']} m/s
-🌥️ Kondisi: {forecast['weather'][0]['description']}
-📊 Tekanan: {forecast['main']['pressure']} hPa
----"""
\ No newline at end of file
+    def parse_forecast(weather_data):
+        """Parse OpenWeatherMap JSON into a Forecast; None if there is no data, MalformedWeatherData if it cannot be read"""
+        if not weather_data:
+            return None
+        try:
+            forecast = Forecast.from_json(weather_data)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise MalformedWeatherData(f"{type(e).__name__}: {e}") from e
+        if not forecast.slots:
+            raise MalformedWeatherData("prakiraan kosong")
+        return forecast